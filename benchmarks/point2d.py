@@ -0,0 +1,103 @@
+"""
+Micro-benchmark comparing utils.Point2D with the dict-backed class it replaced.
+
+    python benchmarks/point2d.py [--number N]
+"""
+import argparse
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from utils import Point2D  # noqa: E402
+
+
+class LegacyPoint2D:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __mul__(self, other):
+        if type(other) not in (int, float, complex):
+            raise TypeError
+        return LegacyPoint2D(self.x * other, self.y * other)
+
+    def __add__(self, other):
+        if type(other) != LegacyPoint2D:
+            raise TypeError
+        return LegacyPoint2D(self.x + other.x, self.y + other.y)
+
+    def __neg__(self):
+        return self * -1
+
+    def __sub__(self, other):
+        return self + -other
+
+    def __eq__(self, other) -> bool:
+        if type(other) != LegacyPoint2D:
+            return False
+        return self.x == other.x and self.y == other.y
+
+    def __str__(self) -> str:
+        return f"({self.x}, {self.y})"
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def dist(self, other) -> float:
+        if type(other) != LegacyPoint2D:
+            raise TypeError
+        return math.sqrt((self.x-other.x)**2+(self.y-other.y)**2)
+
+    def neighbors(self):
+        return [
+            self + LegacyPoint2D(0, -1),
+            self + LegacyPoint2D(1, 0),
+            self + LegacyPoint2D(0, 1),
+            self + LegacyPoint2D(-1, 0)
+        ]
+
+
+CASES = {
+    'construct': 'cls(3, 4)',
+    'hash': 'hash(a)',
+    'dict lookup': 'grid[a]',
+    'add': 'a + b',
+    'sub': 'a - b',
+    'scale': '(a + b) * 32',
+    'dist': 'a.dist(b)',
+    'neighbors': 'a.neighbors()',
+}
+
+
+def run(number: int) -> [(str, float, float)]:
+    results = []
+    for name, statement in CASES.items():
+        timings = []
+        for cls in (LegacyPoint2D, Point2D):
+            setup = {
+                'cls': cls,
+                'a': cls(3, 4),
+                'b': cls(1, 2),
+                'grid': {cls(i, j): None for i in range(8) for j in range(8)},
+            }
+            timings.append(min(timeit.repeat(statement, globals=setup, number=number, repeat=5)))
+        results.append((name, timings[0], timings[1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f'{"operation":<12} {"legacy ns":>10} {"Point2D ns":>11} {"speedup":>8}')
+    for name, legacy, current in run(args.number):
+        print(f'{name:<12} {legacy / args.number * 1e9:>10.1f} {current / args.number * 1e9:>11.1f} '
+              f'{legacy / current:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
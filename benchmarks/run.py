@@ -0,0 +1,282 @@
+"""
+Benchmarks the hot paths of the game under the dummy video driver.
+
+    python benchmarks/run.py [--output results.json] [--baseline old.json] [--threshold 0.2] [--filter text]
+
+Each benchmark reports the median time per operation in microseconds over several repeats. With
+--baseline, the run fails (exit status 1) if any benchmark is slower than its baseline time by
+more than the threshold fraction, so results can be tracked from run to run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+
+import pygame  # noqa: E402
+
+import scenes  # noqa: E402
+from constants import FLOW_FIELD_REFRESH_CELLS  # noqa: E402
+from animation import Animation  # noqa: E402
+from engine import EnemyState, LevelState, Rules  # noqa: E402
+from gamemanager import GameManager  # noqa: E402
+from pathfinding import FlowField  # noqa: E402
+from utils import Point2D  # noqa: E402
+
+
+class StressRules(Rules):
+    """
+    Rules with a fixed enemy count, for boards far busier than any real level
+    """
+    def __init__(self, enemies: int, **kwargs):
+        super().__init__(**kwargs)
+        self.enemies = enemies
+
+    def enemy_count(self, level: int) -> int:
+        return self.enemies
+
+
+SCENARIOS = {
+    'level1': lambda: Rules(),
+    'level31': lambda: Rules(),
+    'stress8x8': lambda: StressRules(40),
+    'stress32x32': lambda: StressRules(300, width=32, height=32),
+}
+LEVELS = {'level1': 1, 'level31': 31}
+
+
+def time_per_op(function, repeat: int, min_time: float = 0.05) -> [float]:
+    """
+    Calls function enough times to fill min_time, repeat times over, and returns seconds per call of each repeat
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= min_time / 10:
+            break
+        number *= 2
+    number = max(1, int(number * min_time / max(time.perf_counter() - start, 1e-9) * 10) // 10)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+
+def make_state(scenario: str, seed: int = 0) -> LevelState:
+    return LevelState(LEVELS.get(scenario, 1), 0, SCENARIOS[scenario](), random.Random(seed))
+
+
+def bench_flow_field(scenario):
+    state = make_state(scenario)
+
+    def run():
+        field = FlowField(state.occupancy, state.player.location, EnemyState)
+        for enemy in state.enemies:
+            field.next_step(enemy.location)
+    return run
+
+
+def bench_entity_at(scenario):
+    state = make_state(scenario)
+    cells = [Point2D(x, y) for x in range(state.rules.width) for y in range(state.rules.height)]
+
+    def run():
+        for cell in cells:
+            state.entity_at(cell)
+    return run
+
+
+def bench_enemy_phase(scenario):
+    moves = random.Random(1)
+
+    def new_state():
+        state = make_state(scenario, moves.randrange(1 << 30))
+        # keep the player alive so the phase is measured rather than level setup
+        state.rules.hit_chance = 0
+        return state
+    state = new_state()
+
+    def run():
+        nonlocal state
+        if state.status() != LevelState.ONGOING:
+            state = new_state()
+        state.player_move(moves.choice(state.legal_moves()))
+        builds = FlowField.builds
+        state.enemy_phase()
+        # on an arena too large to search again after every step, a phase searches it once however many move
+        if state.rules.width * state.rules.height > FLOW_FIELD_REFRESH_CELLS:
+            assert FlowField.builds - builds <= 1, f'{FlowField.builds - builds} flow field builds in one phase'
+    return run
+
+
+def bench_scene_draw(manager, scenario):
+    level = scenes.Level(manager.assets, LEVELS.get(scenario, 1), 0, SCENARIOS[scenario]())
+    surface = pygame.Surface((manager.screen_w, manager.screen_h)).convert()
+    return lambda: level.draw(surface)
+
+
+def bench_text_render(manager):
+    sprite = scenes.TextSprite('0', manager.font, 'white', 'topleft')
+    counter = iter(range(1 << 62))
+    return lambda: sprite.set_text(str(next(counter)))
+
+
+def bench_animation(manager):
+    frame = manager.assets.image('resources/img/sprites/player/front.png')
+    animation = Animation([frame] * 6, framerate=20, repeat=True)
+    animation.start()
+    return lambda: animation.frame_advance(16)
+
+
+def bench_event_dispatch(manager, scenario):
+    level = scenes.Level(manager.assets, LEVELS.get(scenario, 1), 0, SCENARIOS[scenario]())
+    # a key nothing in the level reacts to, so the level stays as it is
+    event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a)
+    return lambda: level.handle(event)
+
+
+def bench_entity_slides(manager, scenario, frames=12):
+    """
+    Every entity sliding one cell and the level advancing until the slides are over, per frame
+    """
+    level = scenes.Level(manager.assets, LEVELS.get(scenario, 1), 0, SCENARIOS[scenario]())
+    entities = [child for child in level.active_children() if isinstance(child, scenes.Entity)]
+
+    def run():
+        for entity in entities:
+            entity.location = entity.actor.location + Point2D(0, 1)
+            entity.follow()
+        for _ in range(frames):
+            level.advance(16)
+    return run, frames
+
+
+def bench_scene_churn(manager, scenario):
+    """
+    An enemy leaving the level and coming back, with the lookups of the player and of an enemy in between
+    """
+    level = scenes.Level(manager.assets, LEVELS.get(scenario, 1), 0, SCENARIOS[scenario]())
+    enemy = level.get_child_by_type('Enemy')
+
+    def run():
+        level.remove(enemy)
+        level.player()
+        level.get_child_by_type('Enemy')
+        level.add(enemy)
+    return run
+
+
+class _FrameCounter(scenes.Level):
+    """
+    A level that always wants frames and exits after a set number of them
+    """
+    def __init__(self, *args, frames: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.frames = frames
+
+    def animating(self) -> bool:
+        return True
+
+    def update(self):
+        super().update()
+        self.frames -= 1
+        if self.frames <= 0:
+            self.exit_code = scenes.Level.LOST
+
+
+def bench_event_loop(manager, scenario, frames=50):
+    def run():
+        manager.event_loop(_FrameCounter(manager.assets, LEVELS.get(scenario, 1), 0, SCENARIOS[scenario](), frames=frames))
+    return run, frames
+
+
+def collect(manager, selected) -> {str: object}:
+    benchmarks = {}
+    for scenario in SCENARIOS:
+        benchmarks[f'flow_field/{scenario}'] = bench_flow_field(scenario)
+        benchmarks[f'entity_at/{scenario}'] = bench_entity_at(scenario)
+        benchmarks[f'enemy_phase/{scenario}'] = bench_enemy_phase(scenario)
+        benchmarks[f'scene_draw/{scenario}'] = bench_scene_draw(manager, scenario)
+        benchmarks[f'event_loop_iteration/{scenario}'] = bench_event_loop(manager, scenario)
+        benchmarks[f'entity_slides/{scenario}'] = bench_entity_slides(manager, scenario)
+        benchmarks[f'event_dispatch/{scenario}'] = bench_event_dispatch(manager, scenario)
+        benchmarks[f'scene_churn/{scenario}'] = bench_scene_churn(manager, scenario)
+    benchmarks['text_render'] = bench_text_render(manager)
+    benchmarks['animation_frame_advance'] = bench_animation(manager)
+    return {name: bench for name, bench in benchmarks.items() if selected in name}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> [str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['median_us'], result['median_us']
+        if after > before * (1 + threshold):
+            regressions.append(f'{name}: {before:.2f}us -> {after:.2f}us ({after / before - 1:+.0%})')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown as a fraction')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    args = parser.parse_args()
+
+    manager = GameManager()
+    manager.framerate = 0
+
+    results = {}
+    for name, bench in collect(manager, args.filter).items():
+        per_call = 1
+        if isinstance(bench, tuple):
+            bench, per_call = bench
+        timings = [t / per_call * 1e6 for t in time_per_op(bench, args.repeat)]
+        results[name] = {
+            'median_us': statistics.median(timings),
+            'min_us': min(timings),
+            'stdev_us': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        }
+        print(f'{name:<40} {results[name]["median_us"]:>12.2f} us', file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'benchmarks': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)['benchmarks'], args.threshold)
+        if regressions:
+            print('regressions over the threshold:', *regressions, sep='\n  ', file=sys.stderr)
+            raise SystemExit(1)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
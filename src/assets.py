@@ -0,0 +1,92 @@
+import os
+import time
+
+import pygame
+
+from atlas import SpriteAtlas
+
+
+class AssetRegistry:
+    """
+    Loads each image and font once and hands out the shared instance on every later request.
+    Images are keyed by path and alpha mode, fonts by path and point size. When a packed atlas index
+    exists, the images in it are served as subsurfaces of its sheet instead of loaded one by one.
+    """
+    def __init__(self, atlas_path: str | None = None):
+        self._atlas_path = atlas_path
+        self._atlas: SpriteAtlas | None = None
+        self._images: {(str, bool): pygame.Surface} = {}
+        self._fonts: {(str, int): pygame.font.Font} = {}
+        self._stats: {tuple: (int, float)} = {}
+        # requests served from the registry instead of loading again
+        self._hits: {tuple: int} = {}
+
+    def image(self, path: str, alpha: bool = True) -> pygame.Surface:
+        key = (path, alpha)
+        surface = self._images.get(key)
+        if surface is not None:
+            self._hits[key] = self._hits.get(key, 0) + 1
+        elif (atlas := self.atlas()) is not None and path in atlas:
+            start = time.perf_counter()
+            # subsurfaces share the sheet's pixels, opaque copies are converted out of it
+            surface = atlas.image(path) if alpha else atlas.image(path).convert()
+            self._images[key] = surface
+            self._record(key, 0 if alpha else surface.get_pitch() * surface.get_height(), start)
+        else:
+            start = time.perf_counter()
+            surface = pygame.image.load(path)
+            # conversion needs a display mode, assets loaded before it (the window icon) stay as decoded
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha() if alpha else surface.convert()
+            self._images[key] = surface
+            self._record(key, surface.get_pitch() * surface.get_height(), start)
+        return surface
+
+    def atlas(self) -> SpriteAtlas | None:
+        """
+        The packed sprite atlas, loaded on first use once a display mode is set, if one has been built
+        """
+        if self._atlas is None and self._atlas_path and pygame.display.get_surface() is not None:
+            if not os.path.exists(self._atlas_path):
+                self._atlas_path = None
+                return None
+            start = time.perf_counter()
+            self._atlas = SpriteAtlas.load(self._atlas_path)
+            self._atlas.convert()
+            sheet = self._atlas.sheet
+            self._record((self._atlas_path, True), sheet.get_pitch() * sheet.get_height(), start)
+        return self._atlas
+
+    def font(self, path: str, size: int) -> pygame.font.Font:
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            self._hits[key] = self._hits.get(key, 0) + 1
+        else:
+            start = time.perf_counter()
+            font = pygame.font.Font(path, size)
+            self._fonts[key] = font
+            self._record(key, os.path.getsize(path), start)
+        return font
+
+    def _record(self, key: tuple, size: int, start: float):
+        self._stats[key] = (size, (time.perf_counter() - start) * 1000)
+
+    def stats(self) -> [(tuple, int, float, int)]:
+        """
+        Returns (key, bytes, load milliseconds, hits) for every loaded asset
+        """
+        return [(key, size, load_ms, self._hits.get(key, 0)) for key, (size, load_ms) in self._stats.items()]
+
+    def total_bytes(self) -> int:
+        return sum(size for size, _ in self._stats.values())
+
+    def report(self) -> str:
+        stats = self.stats()
+        lines = [f'{"asset":<48} {"bytes":>10} {"ms":>8} {"hits":>6}']
+        for key, size, load_ms, hits in sorted(stats, key=lambda s: -s[1]):
+            name = f'{key[0]} ({key[1]})'
+            lines.append(f'{name:<48} {size:>10} {load_ms:>8.2f} {hits:>6}')
+        lines.append(f'{"total":<48} {self.total_bytes():>10} {sum(s[2] for s in stats):>8.2f} '
+                     f'{sum(s[3] for s in stats):>6}')
+        return '\n'.join(lines)
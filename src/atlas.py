@@ -0,0 +1,117 @@
+"""
+Packs the game's images into a single sprite sheet with a JSON index of where each one landed.
+
+    python src/atlas.py
+    python src/atlas.py --root resources/img --output resources/atlas
+
+Run it from the repository root. The index is keyed by the same paths the game loads images by, so
+AssetRegistry can serve them as subsurfaces of the sheet. Without a built atlas every image is loaded
+from its own file as before.
+"""
+import json
+import os
+
+import pygame
+
+
+def collect(root: str, exclude: [str] = ()) -> [str]:
+    """
+    The PNG files under root, as forward slash paths, skipping any under an excluded path
+    """
+    paths = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name).replace(os.sep, '/')
+            if name.endswith('.png') and not any(path.startswith(e) for e in exclude):
+                paths.append(path)
+    return sorted(paths)
+
+
+def pack(sizes: {str: (int, int)}, padding: int = 1) -> ((int, int), {str: (int, int, int, int)}):
+    """
+    Shelf packs rectangles, tallest first, into a power of two wide sheet. Returns the sheet size and
+    the (x, y, w, h) of each rectangle.
+    """
+    area = sum((w + padding) * (h + padding) for w, h in sizes.values())
+    width = 1
+    while width * width < area or width < max((w + padding for w, _ in sizes.values()), default=1):
+        width *= 2
+
+    frames = {}
+    x = y = shelf = 0
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x + w > width:
+            x, y, shelf = 0, y + shelf + padding, 0
+        frames[name] = (x, y, w, h)
+        x += w + padding
+        shelf = max(shelf, h)
+    return (width, y + shelf), frames
+
+
+def build(root: str = 'resources/img', output: str = 'resources/atlas', exclude: [str] = (), padding: int = 1):
+    """
+    Packs every image under root into output.png and writes its index to output.json
+    """
+    images = {path: pygame.image.load(path) for path in collect(root, exclude)}
+    size, frames = pack({path: image.get_size() for path, image in images.items()}, padding)
+
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    for path, (x, y, _, _) in frames.items():
+        sheet.blit(images[path], (x, y))
+    pygame.image.save(sheet, output + '.png')
+
+    with open(output + '.json', 'w') as index:
+        json.dump({'image': os.path.basename(output) + '.png', 'size': size, 'frames': frames}, index, indent=1)
+    return size, frames
+
+
+class SpriteAtlas:
+    """
+    A packed sprite sheet, decoded once, handing out its images as subsurfaces that share its pixels
+    """
+    def __init__(self, sheet: pygame.Surface, frames: {str: (int, int, int, int)}):
+        self.sheet = sheet
+        self.frames = frames
+        self._subsurfaces: {str: pygame.Surface} = {}
+
+    @classmethod
+    def load(cls, index_path: str) -> 'SpriteAtlas':
+        with open(index_path) as index:
+            index = json.load(index)
+        sheet = pygame.image.load(os.path.join(os.path.dirname(index_path), index['image']))
+        return cls(sheet, {path: tuple(frame) for path, frame in index['frames'].items()})
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.frames
+
+    def convert(self):
+        """
+        Converts the sheet to the display's pixel format, which needs a display mode to be set
+        """
+        self.sheet = self.sheet.convert_alpha()
+        self._subsurfaces.clear()
+
+    def image(self, path: str) -> pygame.Surface:
+        surface = self._subsurfaces.get(path)
+        if surface is None:
+            surface = self._subsurfaces[path] = self.sheet.subsurface(self.frames[path])
+        return surface
+
+
+def main():
+    # the game imports this module, the parser is only needed when it is run
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', default='resources/img')
+    parser.add_argument('--output', default='resources/atlas', help='path of the sheet and index, without extension')
+    parser.add_argument('--exclude', action='append', default=['resources/img/background'])
+    parser.add_argument('--padding', type=int, default=1)
+    args = parser.parse_args()
+
+    size, frames = build(args.root, args.output, args.exclude, args.padding)
+    print(f'packed {len(frames)} images into {size[0]}x{size[1]} {args.output}.png')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Plays many seeded headless games across a process pool and summarises the results.
+
+    python src/batch.py --games 5000 --policy greedy
+    python src/batch.py --final-level 16,32 --enemy-health 6,8,10 --enemy-damage 1,2
+
+Comma separated values for the rule options are swept over every combination. A policy is either
+one of the built in names or module:function for any callable taking (state, rng) and returning a
+direction from state.legal_moves().
+"""
+import argparse
+import importlib
+import itertools
+import multiprocessing
+import multiprocessing.pool
+import random
+import statistics
+import time
+from collections import Counter
+
+import solver
+from engine import LevelState, Rules, play
+from utils import Point2D
+
+
+def random_policy(state: LevelState, rng: random.Random) -> Point2D:
+    return rng.choice(state.legal_moves())
+
+
+def greedy_policy(state: LevelState, rng: random.Random) -> Point2D:
+    """
+    Steps towards the nearest enemy, attacking it once adjacent
+    """
+    location = state.player.location
+    target = min(state.enemies, key=lambda e: abs(e.location.x - location.x) + abs(e.location.y - location.y))
+    moves = state.legal_moves()
+    return min(moves, key=lambda d: ((location + d).dist(target.location), rng.random()))
+
+
+POLICIES = {
+    'random': random_policy,
+    'greedy': greedy_policy,
+    'expectimax': solver.policy,
+}
+
+
+def load_policy(name: str):
+    if name in POLICIES:
+        return POLICIES[name]
+    module, _, function = name.partition(':')
+    return getattr(importlib.import_module(module), function)
+
+
+def _play_seed(job: (str, dict, int)) -> (int, int):
+    policy, rules, seed = job
+    return play(load_policy(policy), Rules(**rules), random.Random(seed))
+
+
+def simulate(policy: str, rules: dict, games: int, seed: int = 0, pool: multiprocessing.pool.Pool | None = None) -> dict:
+    """
+    Plays games seeded seed..seed+games-1 and aggregates their scores and levels cleared
+    """
+    jobs = [(policy, rules, seed + i) for i in range(games)]
+    results = pool.map(_play_seed, jobs, chunksize=max(1, games // 64)) if pool else list(map(_play_seed, jobs))
+    scores = [score for score, _ in results]
+    levels = [level for _, level in results]
+    final_level = Rules(**rules).final_level
+    return {
+        'rules': rules,
+        'games': games,
+        'score_mean': statistics.fmean(scores),
+        'score_median': statistics.median(scores),
+        'score_stdev': statistics.pstdev(scores),
+        'score_max': max(scores),
+        'level_mean': statistics.fmean(levels),
+        'win_rate': levels.count(final_level) / games,
+        'levels': dict(sorted(Counter(levels).items())),
+    }
+
+
+def _values(text: str, kind):
+    return [kind(value) for value in text.split(',')] if text else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--policy', default='greedy', help=f'{", ".join(POLICIES)} or module:function')
+    parser.add_argument('--processes', type=int, default=None, help='defaults to one per CPU')
+    parser.add_argument('--final-level', default='')
+    parser.add_argument('--enemy-health', default='')
+    parser.add_argument('--enemy-damage', default='')
+    parser.add_argument('--hit-chance', default='')
+    args = parser.parse_args()
+
+    sweep = {
+        'final_level': _values(args.final_level, int),
+        'enemy_health': _values(args.enemy_health, int),
+        'enemy_damage': _values(args.enemy_damage, int),
+        'hit_chance': _values(args.hit_chance, float),
+    }
+    sweep = {key: values for key, values in sweep.items() if values}
+    combinations = [dict(zip(sweep, values)) for values in itertools.product(*sweep.values())]
+
+    with multiprocessing.Pool(args.processes) as pool:
+        for rules in combinations:
+            start = time.perf_counter()
+            summary = simulate(args.policy, rules, args.games, args.seed, pool)
+            elapsed = time.perf_counter() - start
+            print(f'{rules or "default rules"}: {args.games} games in {elapsed:.1f}s')
+            print(f'  score mean {summary["score_mean"]:.1f} median {summary["score_median"]} '
+                  f'stdev {summary["score_stdev"]:.1f} max {summary["score_max"]}')
+            print(f'  levels cleared mean {summary["level_mean"]:.2f} win rate {summary["win_rate"]:.1%}')
+            print(f'  levels cleared histogram {summary["levels"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import pygame
+
+from constants import PIXELS_PER_TILE
+
+
+class Camera:
+    """
+    The part of the arena on screen, in scene pixels. It centres on whatever it follows and stops at the
+    arena's edges; an arena smaller than the view stays centred in it.
+    """
+    def __init__(self, view_size: (int, int), world_size: (int, int)):
+        self.rect = pygame.Rect((0, 0), view_size)
+        self.world = pygame.Rect((0, 0), world_size)
+        self.rect.center = self.world.center
+        self.rect.clamp_ip(self.world)
+
+    @property
+    def offset(self) -> (int, int):
+        """
+        What to add to arena pixel coordinates to get screen coordinates
+        """
+        return -self.rect.x, -self.rect.y
+
+    def follow(self, pos: (float, float)) -> bool:
+        """
+        Centres the view on pos, returns whether the view moved
+        """
+        rect = self.rect.copy()
+        rect.center = (round(pos[0]), round(pos[1]))
+        rect.clamp_ip(self.world)
+        if rect == self.rect:
+            return False
+        self.rect = rect
+        return True
+
+    def cells(self, margin: int = 1) -> (int, int, int, int):
+        """
+        The (left, top, right, bottom) cells in view, inclusive, widened by margin cells for sprites that
+        overhang their cell or are sliding in from the next one
+        """
+        return (
+            self.rect.left // PIXELS_PER_TILE - margin,
+            self.rect.top // PIXELS_PER_TILE - margin,
+            (self.rect.right - 1) // PIXELS_PER_TILE + margin,
+            (self.rect.bottom - 1) // PIXELS_PER_TILE + margin
+        )
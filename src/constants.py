@@ -3,9 +3,42 @@ VERSION = "0.1.0"
 PIXELS_PER_TILE = 32
 ARENA_GRID_HEIGHT = 8
 ARENA_GRID_WIDTH = 8
+# tiles per side of the baked background chunks
+TILE_CHUNK = 8
+# tiles on screen, the camera scrolls over arenas larger than this
+VIEW_GRID_WIDTH = 8
+VIEW_GRID_HEIGHT = 8
+# arenas of at most this many cells search the enemies' way again after every enemy step, which keeps their
+# steps exact; larger ones search once per turn, as a search per step would grow with the number of enemies
+FLOW_FIELD_REFRESH_CELLS = 256
+# enemies further than this many cells from the player, in either axis, neither take turns nor animate
+ACTIVITY_RADIUS = 12
 ORIGIN = (0, 0)
 FONT_SIZE = 36
+# index written by src/atlas.py, images are loaded one by one when it has not been built
+SPRITE_ATLAS = 'resources/atlas.json'
 FINAL_LEVEL = 32
 INTEGER_SCALING = True
 TARGET_FRAMERATE = 60
+# milliseconds a sprite takes to slide one cell
+MOVE_DURATION = 175
 SUBPIXEL = 1 / PIXELS_PER_TILE
+# points with both coordinates in [0, this) are interned, which keeps the cache bounded wherever points range
+POINT_INTERN_LIMIT = 256
+DIRTY_RECTS = False
+PROFILER = False
+# print how long launching took, from the imports to the first frame on screen
+STARTUP_REPORT = False
+# report keypress to visible move latency percentiles when the game ends
+INPUT_LATENCY = False
+# write every run to replay-<timestamp>.ngr, played back with src/replay.py
+RECORD_REPLAYS = False
+# moves that can be undone within a level
+UNDO_LIMIT = 256
+# a run left with escape or by closing the window is saved here and resumed from the title screen
+SAVE_FILE = 'save.json'
+# moves pressed while the player is busy are buffered, a full buffer drops new presses (drop_new) or old ones (drop_old)
+INPUT_BUFFER_SIZE = 2
+INPUT_BUFFER_POLICY = 'drop_new'
+# milliseconds the hint key searches for the best move
+HINT_BUDGET = 200
@@ -0,0 +1,341 @@
+"""
+Turn rules of Number Go Up without any display dependency, so they can be simulated headless.
+"""
+from __future__ import annotations
+
+import math
+import random
+
+from constants import ACTIVITY_RADIUS, ARENA_GRID_HEIGHT, ARENA_GRID_WIDTH, FINAL_LEVEL, FLOW_FIELD_REFRESH_CELLS
+from occupancy import Occupancy
+from pathfinding import FlowField
+from utils import Direction, Point2D
+
+DIRECTIONS = (Direction.UP, Direction.RIGHT, Direction.DOWN, Direction.LEFT)
+
+
+class Rules:
+    """
+    The tunable numbers of the game, the defaults are the shipped balance
+    """
+    def __init__(
+            self,
+            final_level: int = FINAL_LEVEL,
+            width: int = ARENA_GRID_WIDTH,
+            height: int = ARENA_GRID_HEIGHT,
+            player_multiplier: int = 2,
+            enemy_multiplier: int = 2,
+            enemy_health: int = 8,
+            enemy_damage: int = 1,
+            hit_chance: float = 0.1,
+            par_turns: int = 64,
+            turn_limit: int = 1000,
+            activity_radius: int | None = ACTIVITY_RADIUS):
+        self.final_level = final_level
+        self.width = width
+        self.height = height
+        self.player_multiplier = player_multiplier
+        self.enemy_multiplier = enemy_multiplier
+        self.enemy_health = enemy_health
+        self.enemy_damage = enemy_damage
+        self.hit_chance = hit_chance
+        self.par_turns = par_turns
+        self.turn_limit = turn_limit
+        self.activity_radius = activity_radius
+
+    def enemy_count(self, level: int) -> int:
+        return round(math.log(level + 1, 2))
+
+    def activity_limit(self) -> int | None:
+        """
+        The activity radius, or None when it reaches across the whole arena from every cell and so changes nothing
+        """
+        radius = self.activity_radius
+        if radius is None or radius >= max(self.width, self.height) - 1:
+            return None
+        return radius
+
+    def win_bonus(self, level: int, turns: int) -> int:
+        """
+        Points for clearing a level, more the fewer turns it took
+        """
+        return level * math.floor(max((self.par_turns - turns) / 16, 0))
+
+
+class PlayerState:
+    def __init__(self, location: Point2D, multiplier: int):
+        self.location = location
+        self.multiplier = multiplier
+
+
+class EnemyState:
+    def __init__(self, location: Point2D, multiplier: int, health: int, damage: int):
+        self.location = location
+        self.multiplier = multiplier
+        self.health = health
+        self.damage = damage
+
+
+class Snapshot:
+    """
+    The state of a level at one point, without any display objects. Points are interned and the move
+    history is a shared linked list, so a snapshot is a handful of tuples however long the level ran.
+    """
+    __slots__ = 'score', 'turns', 'player_turn', 'player', 'enemies', 'rng', 'history'
+
+    def __init__(self, score: int, turns: int, player_turn: bool, player: tuple, enemies: tuple, rng: tuple, history):
+        self.score = score
+        self.turns = turns
+        self.player_turn = player_turn
+        self.player = player
+        self.enemies = enemies
+        self.rng = rng
+        self.history = history
+
+    def to_dict(self, moves: [Point2D], waits: {int: (int, ...)} | None = None) -> dict:
+        """
+        A JSON friendly copy, moves and waits being the level's moves in order and LevelState.waits
+        """
+        version, internal, gauss = self.rng
+        return {
+            'score': self.score,
+            'turns': self.turns,
+            'player_turn': self.player_turn,
+            'player': [list(self.player[0]), self.player[1]],
+            'enemies': [[list(enemy[1]), *enemy[2:]] for enemy in self.enemies],
+            'rng': [version, list(internal), gauss],
+            'moves': [DIRECTIONS.index(move) for move in moves],
+            'waits': [[turn, list(waited)] for turn, waited in (waits or {}).items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Snapshot:
+        history = None
+        waits = {turn: tuple(waited) for turn, waited in data.get('waits', ())}
+        for turn, move in enumerate(data['moves']):
+            history = (DIRECTIONS[move], history, waits[turn]) if turn in waits else (DIRECTIONS[move], history)
+        version, internal, gauss = data['rng']
+        enemies = tuple(
+            (EnemyState(Point2D(*location), multiplier, health, damage), Point2D(*location), multiplier, health, damage)
+            for location, multiplier, health, damage in data['enemies']
+        )
+        return cls(
+            data['score'],
+            data['turns'],
+            data['player_turn'],
+            (Point2D(*data['player'][0]), data['player'][1]),
+            enemies,
+            (version, tuple(internal), gauss),
+            history
+        )
+
+
+class LevelState:
+    ONGOING = 0
+    LOST = 1
+    WON = 2
+
+    def __init__(self, level: int = 1, score: int = 0, rules: Rules | None = None, rng: random.Random | None = None):
+        self.rules = rules or Rules()
+        self.rng = rng or random.Random()
+        self.level = level
+        self.score = score
+        self.turns = 0
+        self.player_turn = True
+        # the accepted player moves as a linked list of (direction, earlier moves) pairs, newest first, which
+        # snapshots share instead of copying. A move after which enemies waited carries their indices as a
+        # third item. With the rng's seed they reproduce the level.
+        self.history: (Point2D, tuple) | None = None
+        self.occupancy = Occupancy(self.rules.width, self.rules.height)
+
+        self.player = PlayerState(Point2D(self.rules.width // 2, self.rules.height // 2), self.rules.player_multiplier)
+        self.occupancy.add(self.player, self.player.location)
+        self.enemies: [EnemyState] = []
+        for i in range(self.rules.enemy_count(level)):
+            enemy = EnemyState(
+                self.occupancy.random_free(self.rng),
+                self.rules.enemy_multiplier,
+                self.rules.enemy_health,
+                self.rules.enemy_damage
+            )
+            self.enemies.append(enemy)
+            self.occupancy.add(enemy, enemy.location)
+
+    @property
+    def moves(self) -> [Point2D]:
+        """
+        The directions of the accepted player moves, oldest first
+        """
+        moves = []
+        node = self.history
+        while node is not None:
+            moves.append(node[0])
+            node = node[1]
+        moves.reverse()
+        return moves
+
+    @property
+    def waits(self) -> {int: (int, ...)}:
+        """
+        The enemies that waited out a turn, as indices into the enemy list at the time by turn number
+        """
+        nodes = []
+        node = self.history
+        while node is not None:
+            nodes.append(node)
+            node = node[1]
+        return {turn: node[2] for turn, node in enumerate(reversed(nodes)) if len(node) > 2}
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(
+            self.score,
+            self.turns,
+            self.player_turn,
+            (self.player.location, self.player.multiplier),
+            tuple((enemy, enemy.location, enemy.multiplier, enemy.health, enemy.damage) for enemy in self.enemies),
+            self.rng.getstate(),
+            self.history
+        )
+
+    def restore(self, snapshot: Snapshot):
+        """
+        Puts the level back as it was when snapshot was taken. The player and enemy objects are kept, enemies
+        slain since come back as the same objects.
+        """
+        self.score = snapshot.score
+        self.turns = snapshot.turns
+        self.player_turn = snapshot.player_turn
+        self.player.location, self.player.multiplier = snapshot.player
+        self.enemies = []
+        for enemy, location, multiplier, health, damage in snapshot.enemies:
+            enemy.location, enemy.multiplier, enemy.health, enemy.damage = location, multiplier, health, damage
+            self.enemies.append(enemy)
+        self.rng.setstate(snapshot.rng)
+        self.history = snapshot.history
+
+        self.occupancy = Occupancy(self.rules.width, self.rules.height)
+        self.occupancy.add(self.player, self.player.location)
+        for enemy in self.enemies:
+            self.occupancy.add(enemy, enemy.location)
+
+    def in_bounds(self, point: Point2D) -> bool:
+        return self.occupancy.in_bounds(point)
+
+    def entity_at(self, point: Point2D) -> PlayerState | EnemyState | None:
+        return self.occupancy.at(point)
+
+    def status(self) -> int:
+        if self.player.multiplier < 1:
+            return LevelState.LOST
+        if not self.enemies:
+            return LevelState.WON
+        return LevelState.ONGOING
+
+    def legal_moves(self) -> [Point2D]:
+        return [d for d in DIRECTIONS if self.in_bounds(self.player.location + d)]
+
+    def player_move(self, direction: Point2D) -> bool:
+        """
+        Moves the player one cell, attacking whatever stands there instead. Returns False, keeping the
+        player's turn, if it is not the player's turn or the move leaves the arena.
+        """
+        if not self.player_turn:
+            return False
+
+        target = self.player.location + direction
+        if not self.in_bounds(target):
+            return False
+
+        if entity := self.entity_at(target):
+            entity.health -= self.player.multiplier
+        else:
+            self.occupancy.move(self.player, self.player.location, target)
+            self.player.location = target
+
+        self.history = (direction, self.history)
+        self.player_turn = False
+        return True
+
+    def enemy_phase(self, waiting: {EnemyState} = frozenset()):
+        """
+        Resolves the turn after the player acted. Enemies act in spawn order; the first slain enemy found
+        is collected, multiplying the player's multiplier, and ends the phase for the enemies after it.
+        Enemies in waiting, which the game passes while they are still sliding from their last step, sit
+        the turn out; they are recorded with the move so replays repeat it.
+        """
+        if self.player_turn:
+            return
+
+        radius = self.rules.activity_limit()
+        location = self.player.location
+        # an enemy at the edge of the activity radius is at most 2 * radius steps away on an open board,
+        # the rest of the limit leaves room to path around other enemies
+        field = FlowField(
+            self.occupancy,
+            location,
+            EnemyState,
+            None if radius is None else 4 * radius,
+            self.rules.width * self.rules.height <= FLOW_FIELD_REFRESH_CELLS
+        )
+        waited = []
+        for i, enemy in enumerate(list(self.enemies)):
+            if enemy.health < 1:
+                self.score += self.player.multiplier
+                self.player.multiplier *= enemy.multiplier
+                self.enemies.remove(enemy)
+                self.occupancy.remove(enemy, enemy.location)
+                break
+
+            offset = enemy.location - location
+            if radius is not None and max(abs(offset.x), abs(offset.y)) > radius:
+                continue
+            if enemy in waiting:
+                waited.append(i)
+                continue
+            self.enemy_move(enemy, field)
+
+        if waited and self.history is not None:
+            self.history = (self.history[0], self.history[1], tuple(waited))
+        self.turns += 1
+        self.player_turn = True
+
+    def enemy_move(self, enemy: EnemyState, field: FlowField):
+        step = field.next_step(enemy.location)
+        if step is None:
+            return
+
+        if entity := self.entity_at(step):
+            if entity is self.player:
+                self.attack(enemy)
+        else:
+            self.occupancy.move(enemy, enemy.location, step)
+            enemy.location = step
+
+    def attack(self, enemy: EnemyState):
+        """
+        An enemy trying to hit the player, which lands with the rules' hit chance
+        """
+        if self.rng.random() < self.rules.hit_chance:
+            self.player.multiplier -= enemy.damage
+
+
+def play(policy, rules: Rules | None = None, rng: random.Random | None = None) -> (int, int):
+    """
+    Plays a whole run with policy(state, rng) choosing the player's moves.
+    Returns the final score and the number of levels cleared.
+    """
+    rules = rules or Rules()
+    rng = rng or random.Random()
+    score = 0
+    for level in range(1, rules.final_level + 1):
+        state = LevelState(level, score, rules, rng)
+        while state.status() == LevelState.ONGOING and state.turns < rules.turn_limit:
+            direction = policy(state, rng)
+            if not state.player_move(direction):
+                raise ValueError(f'policy chose the illegal move {direction}')
+            state.enemy_phase()
+
+        if state.status() != LevelState.WON:
+            return state.score, level - 1
+        score = state.score + rules.win_bonus(level, state.turns)
+    return score, rules.final_level
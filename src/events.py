@@ -0,0 +1,83 @@
+import pygame
+
+# input event types nobody may be listening to, blocked from the queue while that is the case. Window and
+# system events are never blocked, pygame relies on them itself.
+INPUT_EVENTS = (
+    pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT, pygame.TEXTEDITING,
+    pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL,
+    pygame.FINGERDOWN, pygame.FINGERUP, pygame.FINGERMOTION,
+    pygame.JOYAXISMOTION, pygame.JOYBALLMOTION, pygame.JOYHATMOTION, pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP,
+    pygame.CONTROLLERAXISMOTION, pygame.CONTROLLERBUTTONDOWN, pygame.CONTROLLERBUTTONUP,
+)
+
+
+class EventBus:
+    """
+    Delivers events to the handlers subscribed to their type, or to their type and key, so an event only
+    costs as much as the handlers that want it. Subscriptions are grouped by owner and dropped together.
+    While filtering, input event types without subscribers are blocked with pygame.event.set_blocked and
+    never reach the queue.
+    """
+    def __init__(self):
+        self._handlers: {(int, int | None): [(object, callable)]} = {}
+        self._owned: {object: [(int, int | None, callable)]} = {}
+        self._counts: {int: int} = {}
+        self._always: {int} = set()
+        self.filtering = False
+
+    def subscribe(self, owner, event_type: int, handler, key: int | None = None):
+        """
+        Calls handler(event) for every event of event_type, or only for those with that key
+        """
+        self._handlers.setdefault((event_type, key), []).append((owner, handler))
+        self._owned.setdefault(owner, []).append((event_type, key, handler))
+        self._counts[event_type] = self._counts.get(event_type, 0) + 1
+        if self.filtering and self._counts[event_type] == 1 and event_type in INPUT_EVENTS:
+            pygame.event.set_allowed(event_type)
+
+    def unsubscribe(self, owner):
+        """
+        Drops every subscription of owner
+        """
+        for event_type, key, handler in self._owned.pop(owner, ()):
+            handlers = self._handlers[(event_type, key)]
+            handlers.remove((owner, handler))
+            if not handlers:
+                del self._handlers[(event_type, key)]
+            self._counts[event_type] -= 1
+            if not self._counts[event_type]:
+                del self._counts[event_type]
+                if self.filtering and event_type in INPUT_EVENTS and event_type not in self._always:
+                    pygame.event.set_blocked(event_type)
+
+    def subscribed(self, event_type: int) -> bool:
+        return event_type in self._counts
+
+    def publish(self, event: pygame.event.Event) -> bool:
+        """
+        Hands event to its subscribers, returns whether there were any
+        """
+        key = getattr(event, 'key', None)
+        handlers = self._handlers.get((event.type, None), ())
+        if key is not None:
+            handlers = [*handlers, *self._handlers.get((event.type, key), ())]
+        elif handlers:
+            # a handler may unsubscribe while this runs
+            handlers = list(handlers)
+        for _, handler in handlers:
+            handler(event)
+        return bool(handlers)
+
+    def filter(self, always: (int, ...) = ()):
+        """
+        Blocks the input event types without subscribers, apart from those in always, until stopped
+        """
+        self.filtering = True
+        self._always = set(always)
+        wanted = self._always.union(self._counts)
+        pygame.event.set_allowed([t for t in INPUT_EVENTS if t in wanted])
+        pygame.event.set_blocked([t for t in INPUT_EVENTS if t not in wanted])
+
+    def stop_filtering(self):
+        self.filtering = False
+        pygame.event.set_allowed(list(INPUT_EVENTS))
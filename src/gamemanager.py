@@ -1,92 +1,236 @@
-from math import floor
+import time
 
 import pygame
+import savegame
 import scenes
+from assets import AssetRegistry
+from engine import LevelState
+from inputqueue import LATENCY, InputQueue
+from preload import LevelPreloader
+from profiler import FrameProfiler
+from replay import LevelRecord, Replay, ReplayDriver
+from scheduler import FrameScheduler
+from solver import HINTS
+from startup import STARTUP
+from viewport import Viewport
 from constants import *
 from sys import exit
 
 
 class GameManager:
     def __init__(self):
-        self.screen_w = PIXELS_PER_TILE * ARENA_GRID_WIDTH
-        self.screen_h = PIXELS_PER_TILE * ARENA_GRID_HEIGHT
+        self.screen_w = PIXELS_PER_TILE * VIEW_GRID_WIDTH
+        self.screen_h = PIXELS_PER_TILE * VIEW_GRID_HEIGHT
         screen_title = f"{TITLE} v{VERSION}"
 
-        pygame.init()
+        # only what the game uses, pygame.init() would also bring up audio and joysticks
+        pygame.display.init()
+        pygame.font.init()
+        STARTUP.mark('sdl init')
 
-        self.font = pygame.font.Font('resources/font/Pixeltype.ttf', FONT_SIZE)
-        icon = pygame.image.load('resources/img/icon.png')
+        self.assets = AssetRegistry(SPRITE_ATLAS)
+        self.font = self.assets.font('resources/font/Pixeltype.ttf', FONT_SIZE)
+        icon = self.assets.image('resources/img/icon.png')
+        STARTUP.mark('assets')
 
         pygame.display.set_icon(icon)
         pygame.display.set_caption(screen_title)
         self.screen = pygame.display.set_mode((self.screen_w, self.screen_h), pygame.RESIZABLE)
+        self.viewport = Viewport((self.screen_w, self.screen_h))
+        STARTUP.mark('display')
 
         self.score = 0
+        self.framerate = TARGET_FRAMERATE
+        # when set, every frame advances the animations by this many milliseconds whatever time has passed
+        self.fixed_step: int | None = None
+        self.profiler = FrameProfiler(self.assets.font('resources/font/Pixeltype.ttf', 18)) if PROFILER else None
+        self.preloader = LevelPreloader(self.assets)
+        self.input = InputQueue(256)
+        self.frames = 0
+        self.recording = Replay()
+        # work that can wait until the first frame is on screen
+        self.deferred: [callable] = []
 
     def run(self):
+        # the first level is built once the title screen is up, every later one while the one before is played
+        self.deferred.append(lambda: self.preloader.prepare(1))
         title_screen = scenes.TitleScreen(TITLE, self.font, (self.screen_w, self.screen_h))
-        if self.event_loop(title_screen) != scenes.TitleScreen.START_GAME:
-            return
-
-        while True:
-            for current_level in range(FINAL_LEVEL):
-                level = scenes.Level(current_level+1, self.score)
+        choice = self.event_loop(title_screen)
+
+        while choice != scenes.TitleScreen.EXIT:
+            if choice == scenes.TitleScreen.NEW_GAME:
+                savegame.delete(SAVE_FILE)
+            level = self.resume()
+            self.score = level.score if level else 0
+            first = level.state.level if level else 1
+            for current_level in range(first - 1, FINAL_LEVEL):
+                if level is None:
+                    start = time.perf_counter()
+                    level = self.preloader.take(current_level+1, self.score)
+                    if self.profiler:
+                        self.profiler.span('transition', start, time.perf_counter())
+                if current_level+1 < FINAL_LEVEL:
+                    self.preloader.prepare(current_level+2)
                 result = self.event_loop(level)
+                self.recording.levels.append(LevelRecord.of(level.state, level.seed))
 
                 if result == scenes.Level.LOST:
                     self.score = level.score
+                    if level.state.status() == LevelState.ONGOING:
+                        # left with escape, the run carries on from here next time
+                        savegame.save(SAVE_FILE, current_level+1, level.seed, level.state)
+                    else:
+                        savegame.delete(SAVE_FILE)
                     print(f'level {current_level+1}: {self.score} ({self.score / (current_level+1)})')
+                    if LATENCY.enabled:
+                        print(LATENCY.report())
                     break
                 elif result == scenes.Level.WON:
-                    self.score = level.score + (current_level + 1) * floor(max((64 - level.turns) / 16, 0))
+                    self.score = level.score + level.state.rules.win_bonus(current_level + 1, level.turns)
+                level = None
+            else:
+                savegame.delete(SAVE_FILE)
 
+            self.save_replay()
+            self.preloader.prepare(1)
             score_disp = scenes.TitleScreen(str(self.score), self.font, (self.screen_w, self.screen_h))
-            if self.event_loop(score_disp) != scenes.TitleScreen.START_GAME:
-                return
-            self.score = 0
-
-    def event_loop(self, scene):
-        clock = pygame.time.Clock()
-        scene_surf = pygame.Surface(size=(self.screen_w, self.screen_h))
+            choice = self.event_loop(score_disp)
+        self.preloader.shutdown()
+        HINTS.shutdown()
+
+    def resume(self) -> scenes.Level | None:
+        """
+        The level of the saved run, as it was left, if there is one
+        """
+        saved = savegame.load(SAVE_FILE)
+        if saved is None:
+            return None
+        number, seed, snapshot = saved
+        level = scenes.Level(self.assets, number, 0, seed=seed)
+        level.restore(snapshot)
+        return level
+
+    def play_replay(self, replay: Replay) -> int:
+        """
+        Plays a recorded run back through the game, returns the number of frames it took
+        """
+        self.preloader.discard()
+        self.score = 0
+        frames = self.frames
+        for i, record in enumerate(replay.levels):
+            level = self.preloader.take(record.level, self.score, record.seed)
+            if i + 1 < len(replay.levels):
+                self.preloader.prepare(replay.levels[i + 1].level, replay.levels[i + 1].seed)
+            result = self.event_loop(level, ReplayDriver(record))
+            self.score = level.score
+            if result == scenes.Level.WON:
+                self.score += level.state.rules.win_bonus(record.level, level.turns)
+        self.preloader.shutdown()
+        return self.frames - frames
+
+    def save_replay(self):
+        if RECORD_REPLAYS and self.recording.levels:
+            path = f'replay-{time.strftime("%Y%m%d-%H%M%S")}.ngr'
+            self.recording.save(path)
+            print('replay written to', path)
+        self.recording = Replay()
+
+    def event_loop(self, scene, driver: ReplayDriver | None = None):
+        scheduler = FrameScheduler(self.framerate)
+        profiler = self.profiler
+        scene_surf = pygame.Surface(size=(self.screen_w, self.screen_h)).convert()
+        time_increment = 0
+        scene.enter()
+        # the keys handled here are wanted whatever the scene listens to
+        scene.events().filter((pygame.KEYDOWN,))
         while scene.exit_code < 0:
-            time_increment = clock.tick()
+            if profiler:
+                profiler.begin_frame()
+            # input is taken at the top of the frame so the update and draw below already act on it
+            self.input.poll(scheduler.poll())
+            while (event := self.input.pop()) is not None:
+                self.dispatch(scene, event)
+            if driver:
+                driver.drive(scene)
+            if profiler:
+                profiler.mark('events')
             scene.update()
-            scene.draw(scene_surf, time_increment)
-
-            # apply scaling to the scene to fit the current window size
-            window_size = pygame.display.get_window_size()
-            window_center = (window_size[0] / 2, window_size[1] / 2)
-            scene_size = scene_surf.get_size()
-            scale_factor = min(
-                        window_size[0]/scene_size[0],
-                        window_size[1]/scene_size[1]
-                    )
-            scale_factor = floor(scale_factor) if INTEGER_SCALING else scale_factor
-            new_size = (scene_size[0] * scale_factor, scene_size[1] * scale_factor)
-            scaled_scene = pygame.transform.scale(scene_surf, new_size)
-            scene_pos = (
-                (window_size[0] - scaled_scene.get_width()) / 2,
-                (window_size[1] - scaled_scene.get_height()) / 2
-            )
-            self.screen.blit(
-                scaled_scene,
-                scene_pos
-            )
-
-            pygame.display.update()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit(0)
-                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F11:
-                        pygame.display.toggle_fullscreen()
-                else:
-                    if hasattr(event, 'pos'):
-                        event.pos = (
-                            (event.pos[0] - scene_pos[0]) / scale_factor,
-                            (event.pos[1] - scene_pos[1]) / scale_factor
-                        )
-                    scene.handle(event)
-
+            if profiler:
+                profiler.mark('update')
+            scene.advance(time_increment)
+            if profiler:
+                profiler.mark('advance')
+            dirty = scene.render(scene_surf, DIRTY_RECTS)
+            if profiler:
+                if profiler.overlay_visible:
+                    overlay = profiler.draw_overlay(scene_surf)
+                    # redraw the scene under the overlay next frame, it is drawn over again afterwards
+                    scene.invalidate(overlay)
+                    if dirty != [scene_surf.get_rect()]:
+                        dirty.append(overlay)
+                profiler.mark('draw')
+            updated = self.viewport.scale(scene_surf, dirty)
+            if profiler:
+                profiler.mark('scale')
+            pygame.display.update(updated)
+            LATENCY.presented()
+            if not self.frames:
+                self.first_frame()
+            if profiler:
+                profiler.mark('display')
+
+            self.frames += 1
+            time_increment = scheduler.next_frame(scene, driver is not None)
+            if self.fixed_step:
+                time_increment = self.fixed_step
+            if profiler:
+                profiler.mark('wait')
+                profiler.end_frame()
+
+        scene.events().stop_filtering()
         return scene.exit_code
+
+    def first_frame(self):
+        """
+        Called once the first frame is presented, to report the startup time and start the deferred work
+        """
+        STARTUP.mark('first present')
+        if STARTUP_REPORT:
+            print(STARTUP.report())
+            print(self.assets.report())
+        for work in self.deferred:
+            work()
+        self.deferred.clear()
+
+    def dispatch(self, scene, event: pygame.event.Event):
+        profiler = self.profiler
+        if event.type == pygame.QUIT:
+            if LATENCY.enabled:
+                print(LATENCY.report())
+            if isinstance(scene, scenes.Level):
+                self.recording.levels.append(LevelRecord.of(scene.state, scene.seed))
+                if scene.state.status() == LevelState.ONGOING:
+                    savegame.save(SAVE_FILE, scene.state.level, scene.seed, scene.state)
+            self.save_replay()
+            self.preloader.shutdown()
+            HINTS.shutdown()
+            pygame.quit()
+            exit(0)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F11:
+            pygame.display.toggle_fullscreen()
+            self.viewport.layout()
+            scene.invalidate()
+        elif profiler and event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            scene.invalidate(profiler.toggle_overlay())
+        elif profiler and event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+            print('profile written to', *profiler.export())
+            print(self.assets.report())
+        else:
+            if event.type == pygame.VIDEORESIZE:
+                self.viewport.layout()
+                scene.invalidate()
+            elif event.type == pygame.VIDEOEXPOSE:
+                scene.invalidate()
+            if hasattr(event, 'pos'):
+                event.pos = self.viewport.to_scene(event.pos)
+            scene.handle(event)
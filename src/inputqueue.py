@@ -0,0 +1,92 @@
+import time
+from collections import deque
+
+import pygame
+
+from constants import INPUT_LATENCY
+
+
+class InputQueue:
+    """
+    Bounded first in, first out queue of input events. Every event keeps the time.perf_counter() reading
+    it arrived at as event.arrived, one not stamped by the scheduler is taken to have arrived when it
+    was queued. The policy decides what a full queue does with a new event:
+    DROP_NEW ignores it, keeping the inputs that came first, DROP_OLD drops the oldest one to make room.
+    """
+    DROP_NEW = 'drop_new'
+    DROP_OLD = 'drop_old'
+
+    def __init__(self, capacity: int, policy: str = DROP_NEW):
+        if policy not in (self.DROP_NEW, self.DROP_OLD):
+            raise ValueError(f'unknown input buffering policy {policy!r}')
+        self.capacity = capacity
+        self.policy = policy
+        self.dropped = 0
+        self._events: deque = deque()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def push(self, event: pygame.event.Event, arrived: float | None = None) -> bool:
+        """
+        Queues event, returns False if the policy dropped it
+        """
+        if not hasattr(event, 'arrived'):
+            event.arrived = time.perf_counter() if arrived is None else arrived
+        if len(self._events) >= self.capacity:
+            self.dropped += 1
+            if self.policy == self.DROP_NEW or not self.capacity:
+                return False
+            self._events.popleft()
+        self._events.append(event)
+        return True
+
+    def poll(self, events: [pygame.event.Event]):
+        arrived = time.perf_counter()
+        for event in events:
+            self.push(event, arrived)
+
+    def pop(self) -> pygame.event.Event | None:
+        return self._events.popleft() if self._events else None
+
+    def clear(self):
+        self._events.clear()
+
+
+class LatencyMeter:
+    """
+    Measures keypress to visible move latency. A move started by a keypress notes when that key arrived,
+    and once the frame showing the move is on the display every noted press becomes a sample.
+
+    Where pygame does not pass SDL's event timestamps on, a press is timed from the frame boundary
+    before it. A press that wakes an idle wait is timed to within the wake up, but one made while a
+    move is animating reads up to a frame late. Time before SDL sees the key, in the keyboard and the
+    OS, and after pygame.display.update returns, in the compositor and the display, is never counted.
+    """
+    def __init__(self, enabled: bool = False, capacity: int = 1024):
+        self.enabled = enabled
+        self.samples: deque = deque(maxlen=capacity)
+        self._acted: [float] = []
+
+    def acted(self, arrived: float):
+        if self.enabled:
+            self._acted.append(arrived)
+
+    def presented(self):
+        if self._acted:
+            now = time.perf_counter()
+            self.samples.extend((now - arrived) * 1000 for arrived in self._acted)
+            self._acted.clear()
+
+    def percentiles(self, points: (int, ...) = (50, 95, 99)) -> [float]:
+        samples = sorted(self.samples)
+        if not samples:
+            return [0.0 for _ in points]
+        return [samples[min(len(samples) - 1, len(samples) * p // 100)] for p in points]
+
+    def report(self) -> str:
+        p50, p95, p99 = self.percentiles()
+        return f'input latency over {len(self.samples)} moves: p50 {p50:.2f}ms p95 {p95:.2f}ms p99 {p99:.2f}ms'
+
+
+LATENCY = LatencyMeter(INPUT_LATENCY)
@@ -1,5 +1,8 @@
+from startup import STARTUP
 from gamemanager import GameManager
 
+STARTUP.mark('imports')
+
 
 def main():
     manager = GameManager()
@@ -0,0 +1,118 @@
+import random
+
+from utils import Point2D
+
+
+class Occupancy:
+    """
+    Incremental index of which entity stands on which arena cell. Every entity kind (its class)
+    gets a bitboard with bit y * width + x set for each occupied cell, and a flat table maps
+    cells back to their entity, so lookups never scan the entity list.
+    """
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.full = (1 << (width * height)) - 1
+        self._boards: {type: int} = {}
+        self._cells: [object | None] = [None] * (width * height)
+
+    def _build_neighbor_mask(self, i: int) -> int:
+        x, y = i % self.width, i // self.width
+        mask = 0
+        for nx, ny in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+            if 0 <= nx < self.width and 0 <= ny < self.height:
+                mask |= 1 << (ny * self.width + nx)
+        return mask
+
+    def index(self, cell: Point2D) -> int:
+        return cell[1] * self.width + cell[0]
+
+    def cell(self, i: int) -> Point2D:
+        return Point2D(i % self.width, i // self.width)
+
+    def in_bounds(self, cell: Point2D) -> bool:
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height
+
+    def add(self, entity, cell: Point2D):
+        i = self.index(cell)
+        self._cells[i] = entity
+        kind = type(entity)
+        self._boards[kind] = self._boards.get(kind, 0) | 1 << i
+
+    def remove(self, entity, cell: Point2D):
+        i = self.index(cell)
+        if self._cells[i] is not entity:
+            return
+        self._cells[i] = None
+        kind = type(entity)
+        self._boards[kind] &= ~(1 << i)
+
+    def move(self, entity, old: Point2D, new: Point2D):
+        self.remove(entity, old)
+        self.add(entity, new)
+
+    def at(self, cell: Point2D):
+        """
+        The entity on cell, or None if it is empty or outside the arena
+        """
+        if not self.in_bounds(cell):
+            return None
+        return self._cells[cell[1] * self.width + cell[0]]
+
+    def mask(self, kind: type | None = None) -> int:
+        """
+        Bitboard of the cells occupied by entities of the given kind, or by any entity
+        """
+        if kind is not None:
+            return self._boards.get(kind, 0)
+        mask = 0
+        for board in self._boards.values():
+            mask |= board
+        return mask
+
+    def occupied(self, cell: Point2D, kind: type | None = None) -> bool:
+        return self.in_bounds(cell) and bool(self.mask(kind) >> self.index(cell) & 1)
+
+    def free_mask(self) -> int:
+        return self.full & ~self.mask()
+
+    def neighbor_mask(self, cell: Point2D) -> int:
+        # built on demand, a table of them costs width * height bitboards, too much for large arenas
+        return self._build_neighbor_mask(self.index(cell))
+
+    def window(self, left: int, top: int, right: int, bottom: int) -> int:
+        """
+        Bitboard of the cells from (left, top) to (right, bottom) inclusive, clipped to the arena
+        """
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, self.width - 1), min(bottom, self.height - 1)
+        if left > right or top > bottom:
+            return 0
+        row = ((1 << (right - left + 1)) - 1) << left
+        mask = 0
+        for y in range(top, bottom + 1):
+            mask |= row << (y * self.width)
+        return mask
+
+    def cells(self, mask: int) -> [Point2D]:
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(self.cell(low.bit_length() - 1))
+            mask ^= low
+        return cells
+
+    def random_free(self, rng: random.Random = random) -> Point2D | None:
+        """
+        Picks a uniformly random unoccupied cell, or None if the arena is full
+        """
+        free = self.free_mask()
+        if not free:
+            return None
+        # on a mostly empty arena a few O(1) bit tests beat enumerating the free cells
+        if free.bit_count() * 2 >= self.width * self.height:
+            while True:
+                i = rng.randrange(self.width * self.height)
+                if free >> i & 1:
+                    return self.cell(i)
+        return rng.choice(self.cells(free))
@@ -0,0 +1,90 @@
+from collections import deque
+
+from occupancy import Occupancy
+from utils import Point2D
+
+
+class FlowField:
+    """
+    Breadth-first distance field from a single goal cell (the player) over the arena grid, routed around
+    the entities of the blocking kind and shared by every enemy chasing that goal, so each enemy reads its
+    next step in O(1) instead of running its own search. With refresh the field is rebuilt on the next
+    lookup whenever the blockers have moved, which keeps every step exact. Without it the field is built
+    once and next_step only passes over neighbors that have filled since, so a whole enemy phase costs
+    one search however many enemies move. With a limit the search stops that many steps from the goal,
+    so its cost follows the limit rather than the arena size.
+    """
+    # fields built so far, which the benchmarks check
+    builds = 0
+
+    def __init__(
+            self,
+            occupancy: Occupancy,
+            goal: Point2D,
+            blocker: type,
+            limit: int | None = None,
+            refresh: bool = False):
+        self.occupancy = occupancy
+        self.goal = goal
+        self.blocker = blocker
+        self.limit = limit
+        self.refresh = refresh
+        self._blocked = 0
+        self._distance: {Point2D: int} | None = None
+
+    def _stale(self) -> bool:
+        return self._distance is None or self.refresh and self._blocked != self.occupancy.mask(self.blocker)
+
+    def distance(self, cell: Point2D) -> int | None:
+        """
+        Number of steps from cell to the goal when the field was last built, or None if the goal could not
+        be reached from it within the limit
+        """
+        if self._stale():
+            self._build()
+        return self._distance.get(cell)
+
+    def next_step(self, cell: Point2D) -> Point2D | None:
+        """
+        Returns the free neighbor of cell that is closest to the goal, or None if there is none. Equally
+        short neighbors are ordered by straight line distance to the goal and then by neighbor order. A
+        refreshed field takes the old per-enemy A* search's step in all but a fraction of a percent of
+        cases, where A* broke a tie between equally short routes the other way.
+        """
+        if self._stale():
+            self._build()
+
+        best = None
+        best_key = None
+        for neighbor in cell.neighbors():
+            steps = self._distance.get(neighbor)
+            if steps is None or type(self.occupancy.at(neighbor)) is self.blocker:
+                continue
+            key = (steps, neighbor.dist(self.goal))
+            if best_key is None or key < best_key:
+                best = neighbor
+                best_key = key
+        return best
+
+    def _build(self):
+        FlowField.builds += 1
+        occupancy = self.occupancy
+        blocked = self._blocked = occupancy.mask(self.blocker)
+        distance = {self.goal: 0}
+        frontier = deque([self.goal])
+        limit = self.limit
+        # bounds and bit index inlined, this loop is most of an enemy turn and of every solver node
+        width, height = occupancy.width, occupancy.height
+        while frontier:
+            current = frontier.popleft()
+            steps = distance[current] + 1
+            if limit is not None and steps > limit:
+                break
+            for neighbor in current.neighbors():
+                if neighbor in distance:
+                    continue
+                x, y = neighbor
+                if 0 <= x < width and 0 <= y < height and not blocked >> (y * width + x) & 1:
+                    distance[neighbor] = steps
+                    frontier.append(neighbor)
+        self._distance = distance
@@ -0,0 +1,62 @@
+import random
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import scenes
+from assets import AssetRegistry
+from engine import LevelState, Rules
+
+
+class LevelPreloader:
+    """
+    Sets levels up on a worker thread ahead of when they are played. The worker only runs the rules'
+    side, enemy placement and the occupancy index, which touch no display state; the sprites, HUD text
+    and tilemap are made on the main thread when the level is taken, from caches shared with the levels
+    before it. Each level gets its own seed, drawn when it is requested, so the levels of a run do not
+    depend on when the worker got to them.
+    """
+    def __init__(self, assets: AssetRegistry, rules: Rules | None = None, rng: random.Random | None = None):
+        self.assets = assets
+        self.rules = rules
+        self.rng = rng or random.Random()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preload')
+        # the seed and the state being set up of every prepared level
+        self._pending: {int: (int, Future)} = {}
+
+    def prepare(self, level: int, seed: int | None = None):
+        """
+        Starts setting level up in the background, unless it already is. Without a seed one is drawn.
+        """
+        if level not in self._pending:
+            seed = self.rng.getrandbits(64) if seed is None else seed
+            self._pending[level] = (seed, self._executor.submit(self._state, level, seed))
+
+    def take(self, level: int, score: int, seed: int | None = None) -> scenes.Level:
+        """
+        The prepared level, waiting for the worker if it is not done yet, or set up here if it was never
+        requested, with seed if one is given. Every other prepared level is dropped.
+        """
+        pending = self._pending.pop(level, None)
+        if pending is not None:
+            seed, future = pending
+            state = future.result()
+        else:
+            seed = self.rng.getrandbits(64) if seed is None else seed
+            state = self._state(level, seed)
+        self.discard()
+        state.score = score
+        return scenes.Level(self.assets, level, score, self.rules, seed=seed, state=state)
+
+    def discard(self):
+        for _, future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def shutdown(self):
+        """
+        Drops the queued levels and waits for the one being set up
+        """
+        self._pending.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _state(self, level: int, seed: int) -> LevelState:
+        return LevelState(level, 0, self.rules, random.Random(seed))
@@ -0,0 +1,152 @@
+import time
+from array import array
+from collections import deque
+
+import pygame
+
+
+class FrameProfiler:
+    """
+    Times each phase of the event loop into a fixed size ring buffer of the most recent frames. Phases are
+    marked in order as the frame runs, the overlay shows frame time percentiles on screen, and the buffer
+    can be exported as a Chrome trace (chrome://tracing, Perfetto) and as CSV for offline analysis. One off
+    spans outside the frame, like level transitions, are recorded alongside the frames.
+    """
+    PHASES = ('events', 'update', 'advance', 'draw', 'scale', 'display', 'wait')
+    # time the loop spends blocked waiting for the next frame is not work, so it is left out of frame times
+    IDLE = 'wait'
+    OVERLAY_REFRESH_MS = 250
+
+    def __init__(self, font: pygame.font.Font, capacity: int = 1024):
+        self.font = font
+        self.capacity = capacity
+        self.frames = 0
+        self.overlay_visible = False
+        self.overlay_rect = pygame.Rect(0, 0, 0, 0)
+        self._index = {phase: i for i, phase in enumerate(self.PHASES)}
+        self._durations = array('d', bytes(8 * capacity * len(self.PHASES)))
+        self._starts = array('d', bytes(8 * capacity))
+        self._origin = time.perf_counter()
+        self._last = self._origin
+        self._overlay: pygame.Surface | None = None
+        self._overlay_time = 0.0
+        self._spans: deque = deque(maxlen=capacity)
+
+    def begin_frame(self):
+        self._last = time.perf_counter()
+        self._starts[self.frames % self.capacity] = (self._last - self._origin) * 1000
+
+    def mark(self, phase: str):
+        """
+        Ends the named phase of the current frame, it is timed from the end of the previous mark
+        """
+        now = time.perf_counter()
+        slot = self.frames % self.capacity * len(self.PHASES) + self._index[phase]
+        self._durations[slot] = (now - self._last) * 1000
+        self._last = now
+
+    def end_frame(self):
+        self.frames += 1
+
+    def span(self, name: str, start: float, end: float):
+        """
+        Records a one off span between two time.perf_counter() readings
+        """
+        self._spans.append((name, (start - self._origin) * 1000, (end - start) * 1000))
+
+    def last_span(self, name: str) -> float | None:
+        """
+        Milliseconds taken by the most recent span with that name, if any was recorded
+        """
+        for span_name, _, duration in reversed(self._spans):
+            if span_name == name:
+                return duration
+        return None
+
+    def _recorded(self) -> range:
+        return range(max(0, self.frames - self.capacity), self.frames)
+
+    def durations(self, phase: str | None = None) -> [float]:
+        """
+        Milliseconds spent in phase, or in the whole frame apart from waiting, for each recorded frame
+        """
+        phases = [self._index[phase]] if phase else [i for p, i in self._index.items() if p != self.IDLE]
+        width = len(self.PHASES)
+        return [
+            sum(self._durations[frame % self.capacity * width + i] for i in phases)
+            for frame in self._recorded()
+        ]
+
+    def percentiles(self, phase: str | None = None, points: (int, ...) = (50, 95, 99)) -> [float]:
+        samples = sorted(self.durations(phase))
+        if not samples:
+            return [0.0 for _ in points]
+        return [samples[min(len(samples) - 1, len(samples) * p // 100)] for p in points]
+
+    def toggle_overlay(self) -> pygame.Rect:
+        """
+        Shows or hides the overlay, returns the scene area it covered so it can be redrawn
+        """
+        self.overlay_visible = not self.overlay_visible
+        self._overlay = None
+        return self.overlay_rect
+
+    def draw_overlay(self, surface: pygame.Surface) -> pygame.Rect:
+        """
+        Blits the overlay onto the top right of surface and returns the area it covers
+        """
+        now = time.perf_counter()
+        if self._overlay is None or (now - self._overlay_time) * 1000 >= self.OVERLAY_REFRESH_MS:
+            self._overlay_time = now
+            lines = ['ms      p50   p95   p99']
+            for phase in (None,) + self.PHASES:
+                p50, p95, p99 = self.percentiles(phase)
+                lines.append(f'{phase or "frame":<7}{p50:>6.2f}{p95:>6.2f}{p99:>6.2f}')
+            if (transition := self.last_span('transition')) is not None:
+                lines.append(f'{"level":<7}{transition:>6.2f}')
+            rendered = [self.font.render(line, False, 'white') for line in lines]
+            height = self.font.get_linesize()
+            self._overlay = pygame.Surface((max(r.get_width() for r in rendered) + 4, height * len(lines) + 4))
+            self._overlay.set_alpha(200)
+            for i, line in enumerate(rendered):
+                self._overlay.blit(line, (2, 2 + i * height))
+        self.overlay_rect = self._overlay.get_rect(topright=(surface.get_width(), 0))
+        surface.blit(self._overlay, self.overlay_rect)
+        return self.overlay_rect
+
+    def export(self, prefix: str = 'profile') -> (str, str):
+        """
+        Writes the recorded frames as <prefix>-<timestamp>.json in Chrome trace format and as a .csv,
+        returns both paths
+        """
+        # only needed here, so they are not imported when the game starts
+        import csv
+        import json
+
+        name = f'{prefix}-{time.strftime("%Y%m%d-%H%M%S")}'
+        width = len(self.PHASES)
+        rows = []
+        for frame in self._recorded():
+            start = self._starts[frame % self.capacity]
+            for phase, i in self._index.items():
+                duration = self._durations[frame % self.capacity * width + i]
+                rows.append((frame, phase, start, duration))
+                start += duration
+
+        events = [
+            {'name': phase, 'cat': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1, 'ts': start * 1000, 'dur': duration * 1000,
+             'args': {'frame': frame}}
+            for frame, phase, start, duration in rows
+        ]
+        events += [
+            {'name': span, 'cat': 'span', 'ph': 'X', 'pid': 1, 'tid': 2, 'ts': start * 1000, 'dur': duration * 1000}
+            for span, start, duration in self._spans
+        ]
+        rows += [('', span, start, duration) for span, start, duration in self._spans]
+        with open(f'{name}.json', 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+        with open(f'{name}.csv', 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('frame', 'phase', 'start_ms', 'duration_ms'))
+            writer.writerows(rows)
+        return f'{name}.json', f'{name}.csv'
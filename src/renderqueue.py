@@ -0,0 +1,66 @@
+from bisect import bisect_left, bisect_right
+from itertools import count
+from math import inf
+
+
+class Layer:
+    BACKGROUND = 0
+    SHADOWS = 1
+    SPRITES = 2
+    HUD = 3
+
+
+class RenderQueue:
+    """
+    Drawables kept in draw order by (layer, row), ties broken by the order they were added. The order is
+    maintained on add, remove and move, so drawing a frame is a plain walk over the queue.
+    """
+    def __init__(self):
+        self._keys: [tuple] = []
+        self._items: [object] = []
+        self._entries: {object: tuple} = {}
+        self._sequence = count()
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item) -> bool:
+        return item in self._entries
+
+    def rows(self, layer: int, first: float = -inf, last: float = inf) -> list:
+        """
+        The items of one layer on rows first to last inclusive, in draw order
+        """
+        start = bisect_left(self._keys, (layer, first))
+        end = bisect_right(self._keys, (layer, last, inf))
+        return self._items[start:end]
+
+    def add(self, item, layer: int, row: float = 0):
+        self._insert(item, (layer, row, next(self._sequence)))
+
+    def remove(self, item):
+        key = self._entries.pop(item, None)
+        if key is None:
+            return
+        i = bisect_left(self._keys, key)
+        del self._keys[i]
+        del self._items[i]
+
+    def move(self, item, row: float):
+        """
+        Re-sorts item to a new row within its layer, keeping its place among items on the same row
+        """
+        key = self._entries[item]
+        if key[1] == row:
+            return
+        self.remove(item)
+        self._insert(item, (key[0], row, key[2]))
+
+    def _insert(self, item, key: tuple):
+        i = bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self._items.insert(i, item)
+        self._entries[item] = key
@@ -0,0 +1,180 @@
+"""
+Records runs as a seed and the moves taken for every level, and plays them back.
+
+    python src/replay.py replay-20240101-120000.ngr              # watch it at game speed
+    python src/replay.py replay-20240101-120000.ngr --fast       # unthrottled event loop, for profiling
+    python src/replay.py replay-20240101-120000.ngr --headless   # rules only, as fast as they run
+
+Every level's enemy placement and hit rolls come from its own seeded RNG, so the accepted moves, and the
+turns some enemies waited out because they were still sliding, are all that is needed to reproduce it,
+turn by turn, independent of frame timing. The log is binary: a header, then per level its number, seed,
+move count, whether it was abandoned and its wait count, followed by the moves packed four to a byte and
+each wait as its turn, enemy count and enemy indices, all 32 bit. Logs of the earlier versions still load.
+"""
+from __future__ import annotations
+
+import random
+import struct
+import time
+
+from engine import DIRECTIONS, LevelState, Rules
+from utils import Point2D
+
+MAGIC = b'NGU\x03'
+LEVEL = struct.Struct('<HQIBI')
+WAIT = struct.Struct('<II')
+# the level header, wait header and enemy index format of every version: the first had no waits, the second
+# stored wait sizes and indices in bytes, which large arenas overflow
+FORMATS = {
+    b'NGU\x01': (struct.Struct('<HQIB'), None, None),
+    b'NGU\x02': (struct.Struct('<HQIBH'), struct.Struct('<IB'), 'B'),
+    MAGIC: (LEVEL, WAIT, 'I'),
+}
+
+
+class LevelRecord:
+    def __init__(
+            self,
+            level: int,
+            seed: int,
+            moves: [Point2D],
+            abandoned: bool = False,
+            waits: {int: (int, ...)} | None = None):
+        self.level = level
+        self.seed = seed
+        self.moves = moves
+        self.abandoned = abandoned
+        self.waits = waits or {}
+
+    @classmethod
+    def of(cls, state: LevelState, seed: int) -> 'LevelRecord':
+        # a level that ended while still in play was left with escape or by quitting
+        return cls(state.level, seed, list(state.moves), state.status() == LevelState.ONGOING, state.waits)
+
+
+class Replay:
+    """
+    The levels of one run, in the order they were played
+    """
+    def __init__(self, levels: [LevelRecord] | None = None):
+        self.levels = levels or []
+
+    def to_bytes(self) -> bytes:
+        data = bytearray(MAGIC)
+        index = {direction: i for i, direction in enumerate(DIRECTIONS)}
+        for record in self.levels:
+            data += LEVEL.pack(record.level, record.seed, len(record.moves), record.abandoned, len(record.waits))
+            packed = bytearray((len(record.moves) + 3) // 4)
+            for i, move in enumerate(record.moves):
+                packed[i // 4] |= index[move] << (i % 4 * 2)
+            data += packed
+            for turn, waited in record.waits.items():
+                data += WAIT.pack(turn, len(waited)) + struct.pack(f'<{len(waited)}I', *waited)
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Replay':
+        if data[:len(MAGIC)] not in FORMATS:
+            raise ValueError('not a replay log')
+        header, wait, index = FORMATS[data[:len(MAGIC)]]
+        levels = []
+        offset = len(MAGIC)
+        while offset < len(data):
+            level, seed, count, abandoned, *wait_count = header.unpack_from(data, offset)
+            offset += header.size
+            moves = [DIRECTIONS[data[offset + i // 4] >> (i % 4 * 2) & 3] for i in range(count)]
+            offset += (count + 3) // 4
+            waits = {}
+            for _ in range(wait_count[0] if wait_count else 0):
+                turn, enemies = wait.unpack_from(data, offset)
+                offset += wait.size
+                indices = struct.Struct(f'<{enemies}{index}')
+                waits[turn] = indices.unpack_from(data, offset)
+                offset += indices.size
+            levels.append(LevelRecord(level, seed, moves, bool(abandoned), waits))
+        return cls(levels)
+
+    def save(self, path: str):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'Replay':
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class ReplayDriver:
+    """
+    Plays one recorded level through a running Level scene, taking each move as soon as the player can
+    """
+    def __init__(self, record: LevelRecord):
+        self.record = record
+        self._moves = iter(record.moves)
+
+    def drive(self, level):
+        level.waits = self.record.waits
+        player = level.player()
+        if not level.state.player_turn or player.moving():
+            return
+        direction = next(self._moves, None)
+        if direction is not None:
+            player.move(direction)
+        else:
+            # out of moves with the level still going, it was abandoned here
+            level.exit_code = level.LOST
+
+
+def play_headless(replay: Replay, rules: Rules | None = None) -> [(int, int, int)]:
+    """
+    Replays the rules of every level without a display. Returns (level, status, score) for each.
+    """
+    rules = rules or Rules()
+    score = 0
+    results = []
+    for record in replay.levels:
+        state = LevelState(record.level, score, rules, random.Random(record.seed))
+        for turn, direction in enumerate(record.moves):
+            if not state.player_move(direction):
+                raise ValueError(f'level {record.level} turn {turn}: recorded move {direction} is illegal')
+            state.enemy_phase({state.enemies[i] for i in record.waits.get(turn, ())})
+        status = state.status()
+        score = state.score + (rules.win_bonus(record.level, state.turns) if status == LevelState.WON else 0)
+        results.append((record.level, status, score))
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--fast', action='store_true', help='run the event loop uncapped, a fixed time step per frame')
+    mode.add_argument('--headless', action='store_true', help='replay the rules only')
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    if args.headless:
+        start = time.perf_counter()
+        results = play_headless(replay)
+        turns = sum(len(record.moves) for record in replay.levels)
+        for level, status, score in results:
+            print(f'level {level}: {("ongoing", "lost", "won")[status]}, score {score}')
+        print(f'{turns} turns in {time.perf_counter() - start:.3f}s')
+        return
+
+    from constants import TARGET_FRAMERATE
+    from gamemanager import GameManager
+    manager = GameManager()
+    if args.fast:
+        manager.framerate = 0
+        manager.fixed_step = 1000 // TARGET_FRAMERATE
+    start = time.perf_counter()
+    frames = manager.play_replay(replay)
+    elapsed = time.perf_counter() - start
+    print(f'score {manager.score}, {frames} frames in {elapsed:.2f}s ({frames / elapsed:.0f} fps)')
+
+
+if __name__ == '__main__':
+    main()
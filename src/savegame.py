@@ -0,0 +1,40 @@
+"""
+Saves a run left mid level and resumes it. A save holds the level number, its seed and a snapshot of the
+level's state, so resuming rebuilds the level from its seed and restores the snapshot over it.
+"""
+from __future__ import annotations
+
+import json
+import os
+
+from engine import LevelState, Snapshot
+
+VERSION = 1
+
+
+def save(path: str, level: int, seed: int, state: LevelState):
+    snapshot = state.snapshot().to_dict(state.moves, state.waits)
+    data = {'version': VERSION, 'level': level, 'seed': seed, 'state': snapshot}
+    # written aside and moved over the old save, so a crash midway never leaves a broken one
+    with open(path + '.tmp', 'w') as file:
+        json.dump(data, file, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+
+
+def load(path: str) -> (int, int, Snapshot) | None:
+    """
+    The saved (level, seed, snapshot), or None if there is no save this version can read
+    """
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != VERSION:
+        return None
+    return data['level'], data['seed'], Snapshot.from_dict(data['state'])
+
+
+def delete(path: str):
+    if os.path.exists(path):
+        os.remove(path)
@@ -1,13 +1,26 @@
 from __future__ import annotations
 
 import random
+from collections import deque
+from concurrent.futures import Future
+
 import pygame
 import pygame.image
 
-from constants import FONT_SIZE
+from assets import AssetRegistry
+from camera import Camera
+from constants import FONT_SIZE, INPUT_BUFFER_POLICY, INPUT_BUFFER_SIZE, UNDO_LIMIT
 from animation import AnimationController, Animation
-from constants import ORIGIN, PIXELS_PER_TILE
-from utils import *
+from constants import MOVE_DURATION, ORIGIN, PIXELS_PER_TILE, VIEW_GRID_HEIGHT, VIEW_GRID_WIDTH
+from events import EventBus
+from engine import EnemyState, LevelState, PlayerState, Rules, Snapshot
+from inputqueue import LATENCY, InputQueue
+from renderqueue import Layer, RenderQueue
+from solver import HINTS
+from text import TEXT_CACHE
+from tilemap import TileMap, floor
+from tween import Tween, Tweens
+from utils import Direction, Point2D
 
 
 class Scene:
@@ -15,383 +28,744 @@ class Scene:
         self.location: Point2D = Point2D(0, 0)
         self.layer = 0
         self.exit_code = -1
-        self._children: [Scene] = []
+        # the children in the order they were added, as dict keys so adding and removing one is O(1), with
+        # indexes by type and by role. Iteration goes through a tuple of them, remade after they change.
+        self._children: {Scene: None} = {}
+        self._types: {type: {Scene: None}} = {}
+        self._roles: {str: Scene} = {}
+        self._ordered: (Scene, ...) | None = ()
+        self._role: str | None = None
+        self._queue = RenderQueue()
         self.parent: Scene | None = None
+        self._dirty: [pygame.Rect] = []
+        self._full_redraw = True
+        self._bus: EventBus | None = None
 
-    def add(self, child: Scene):
+    def add(self, child: Scene, role: str | None = None):
+        """
+        Adds child, in the named role if one is given, which role() then finds it by
+        """
         child.parent = self
-        self._children.append(child)
+        self._children[child] = None
+        self._types.setdefault(type(child), {})[child] = None
+        if role is not None:
+            if (previous := self._roles.get(role)) is not None:
+                previous._role = None
+            self._roles[role] = child
+            child._role = role
+        self._ordered = None
+        for drawable, layer in child.drawables():
+            self._queue.add(drawable, layer, child.location.y)
+        if (bus := self._root()._bus) is not None:
+            child._subscribe(bus)
 
     def remove(self, child: Scene | int):
-        if child in self._children:
-            child.parent = None
-            self._children.remove(child)
-            return child
-        elif child < len(self._children):
-            return self._children.pop(child)
-        return None
+        if isinstance(child, int):
+            child = self.child(child)
+        if child is None or child not in self._children:
+            return None
+        child.parent = None
+        del self._children[child]
+        of_type = self._types[type(child)]
+        del of_type[child]
+        if not of_type:
+            del self._types[type(child)]
+        if child._role is not None:
+            del self._roles[child._role]
+            child._role = None
+        self._ordered = None
+        for drawable, _ in child.drawables():
+            self._queue.remove(drawable)
+        if (bus := self._root()._bus) is not None:
+            child._unsubscribe(bus)
+        return child
+
+    def subscriptions(self) -> tuple:
+        """
+        The (event type, handler, key) triples the scene listens to, a key of None taking every event of the type
+        """
+        return ()
+
+    def events(self) -> EventBus:
+        """
+        The event bus of the scene's tree, kept by its root and made on first use
+        """
+        root = self._root()
+        if root._bus is None:
+            root._bus = EventBus()
+            root._subscribe(root._bus)
+        return root._bus
+
+    def _root(self) -> Scene:
+        scene = self
+        while scene.parent is not None:
+            scene = scene.parent
+        return scene
+
+    def _subscribe(self, bus: EventBus):
+        for event_type, handler, key in self.subscriptions():
+            bus.subscribe(self, event_type, handler, key)
+        for child in self._children:
+            child._subscribe(bus)
+
+    def _unsubscribe(self, bus: EventBus):
+        bus.unsubscribe(self)
+        for child in self._children:
+            child._unsubscribe(bus)
+
+    def drawables(self) -> tuple:
+        """
+        The (drawable, layer) pairs the scene puts in its parent's render queue
+        """
+        return (self, self.layer),
+
+    def restack(self, child: Scene):
+        """
+        Moves child to its current row in the draw order, called when it changes rows
+        """
+        for drawable, _ in child.drawables():
+            self._queue.move(drawable, child.location.y)
 
     def child(self, i: int) -> Scene:
-        return self._children[i] if i < len(self._children) else None
+        children = self.children()
+        return children[i] if i < len(children) else None
+
+    def children(self) -> (Scene, ...):
+        """
+        The children in the order they were added. Children added or removed while it is iterated over
+        do not affect it.
+        """
+        if self._ordered is None:
+            self._ordered = tuple(self._children)
+        return self._ordered
 
-    def draw(self, surface: pygame.surface.Surface, time_increment: int):
-        for child in sorted(self._children, key=lambda i: i.location.y):
-            child.draw(surface, time_increment)
+    def of_type(self, kind: type) -> (Scene, ...):
+        """
+        The children of exactly that type, in the order they were added
+        """
+        of_type = self._types.get(kind)
+        return tuple(of_type) if of_type else ()
+
+    def role(self, name: str) -> Scene | None:
+        return self._roles.get(name)
+
+    def active_children(self) -> [Scene]:
+        """
+        The children that take part in update and advance, all of them unless a scene limits it
+        """
+        return self.children()
+
+    def enter(self):
+        """
+        Called by the event loop when the scene starts being shown. Scenes can be built off the main
+        thread, so anything touching the display belongs here rather than in __init__.
+        """
+        return
+
+    def advance(self, time_increment: int):
+        """
+        Steps animations forward by time_increment milliseconds
+        """
+        for child in self.active_children():
+            child.advance(time_increment)
+
+    def animating(self) -> bool:
+        """
+        Whether the scene needs frames at the target framerate, as opposed to waiting for input
+        """
+        for child in self.active_children():
+            if child.animating():
+                return True
+        return False
+
+    def next_deadline(self) -> int | None:
+        """
+        Milliseconds until the scene has something scheduled to happen without input, if anything
+        """
+        deadlines = [d for child in self.active_children() if (d := child.next_deadline()) is not None]
+        return min(deadlines) if deadlines else None
+
+    def draw(self, surface: pygame.surface.Surface):
+        for drawable in self._queue:
+            drawable.draw(surface)
+
+    def invalidate(self, rect: pygame.Rect | None = None):
+        """
+        Marks a region of the root scene as changed, or all of it when no rect is given
+        """
+        if self.parent is not None:
+            self.parent.invalidate(rect)
+        elif rect is None:
+            self._full_redraw = True
+        elif not self._full_redraw:
+            self._dirty.append(pygame.Rect(rect))
+
+    def render(self, surface: pygame.surface.Surface, dirty_only: bool = False) -> [pygame.Rect]:
+        """
+        Draws the scene and returns the regions of surface that changed. With dirty_only set, only the
+        invalidated regions are redrawn, clipped, on top of the previous frame.
+        """
+        if not dirty_only or self._full_redraw:
+            self._full_redraw = False
+            self._dirty.clear()
+            self.draw(surface)
+            return [surface.get_rect()]
+
+        dirty = _merge_rects(self._dirty, surface.get_rect())
+        self._dirty = []
+        for rect in dirty:
+            surface.set_clip(rect)
+            self.draw(surface)
+        surface.set_clip(None)
+        return dirty
 
     def update(self):
-        for child in self._children:
+        for child in self.active_children():
             child.update()
 
     def handle(self, event: pygame.event.Event):
-        for child in self._children:
-            child.handle(event)
+        """
+        Delivers event to whatever in the scene's tree subscribed to it
+        """
+        self.events().publish(event)
 
-    def get_child_by_type(self, t: str):
+    def get_child_by_type(self, t: type | str):
         """
-        Gets the first child where the child's type matches the given string
+        Gets the first child of the given type, or whose type has the given name
         """
-        for child in self._children:
-            if child.__class__.__name__ == t:
-                return child
+        for kind, children in self._types.items():
+            if kind is t or kind.__name__ == t:
+                return next(iter(children))
         return None
 
 
+def _merge_rects(rects: [pygame.Rect], bounds: pygame.Rect) -> [pygame.Rect]:
+    """
+    Clips rects to bounds and unions the overlapping ones so no region is drawn twice
+    """
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if not rect.w or not rect.h:
+            continue
+        while (i := rect.collidelist(merged)) >= 0:
+            rect.union_ip(merged.pop(i))
+        merged.append(rect)
+    return merged
+
+
 class TitleScreen(Scene):
     START_GAME = 1
     EXIT = 2
+    NEW_GAME = 3
 
     def __init__(self, title, font, window_size):
         super().__init__()
 
-        self.add(TextSprite(title, font, anchor='midbottom', pos=(window_size[0] / 2, window_size[1] / 2)))
+        self.add(TextSprite(title, font, anchor='midbottom', pos=(window_size[0] / 2, window_size[1] / 2)), 'title')
+
+    def enter(self):
         pygame.mouse.set_visible(True)
 
-    def draw(self, surface: pygame.surface.Surface, time_increment: int):
+    def draw(self, surface: pygame.surface.Surface):
         surface.fill('skyblue')
-        super().draw(surface, time_increment)
+        super().draw(surface)
+
+    def subscriptions(self) -> tuple:
+        return (
+            (pygame.KEYDOWN, self.exit, pygame.K_ESCAPE),
+            (pygame.KEYDOWN, self.new_game, pygame.K_n),
+            (pygame.KEYDOWN, self.highlight, pygame.K_RETURN),
+            (pygame.KEYUP, self.start, pygame.K_RETURN),
+            (pygame.MOUSEMOTION, self.hover, None),
+            (pygame.MOUSEBUTTONDOWN, self.click, None),
+        )
 
-    def handle(self, event: pygame.event.Event):
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE:
-                self.exit_code = self.EXIT
-            elif event.key == pygame.K_RETURN:
-                self.get_child_by_type('TextSprite').set_color('white')
-        elif event.type == pygame.KEYUP:
-            if event.key == pygame.K_RETURN:
-                self.exit_code = self.START_GAME
-        elif event.type == pygame.MOUSEMOTION:
-            child = self.get_child_by_type('TextSprite')
-            if child.rect.collidepoint(event.pos):
-                child.set_color('white')
-            else:
-                child.set_color('black')
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            child = self.get_child_by_type('TextSprite')
-            if child.rect.collidepoint(event.pos):
-                self.exit_code = self.START_GAME
+    def exit(self, event: pygame.event.Event):
+        self.exit_code = self.EXIT
 
+    def new_game(self, event: pygame.event.Event):
+        self.exit_code = self.NEW_GAME
 
-class Level(Scene):
-    LOST = 1
-    WON = 2
+    def start(self, event: pygame.event.Event):
+        self.exit_code = self.START_GAME
+
+    def highlight(self, event: pygame.event.Event):
+        self.role('title').set_color('white')
 
-    def __init__(self, level: int = 1, score: int = 0):
+    def hover(self, event: pygame.event.Event):
+        title = self.role('title')
+        title.set_color('white' if title.rect.collidepoint(event.pos) else 'black')
+
+    def click(self, event: pygame.event.Event):
+        if self.role('title').rect.collidepoint(event.pos):
+            self.exit_code = self.START_GAME
+
+
+class Level(Scene):
+    LOST = LevelState.LOST
+    WON = LevelState.WON
+    HINT_NAMES = {Direction.UP: 'up', Direction.RIGHT: 'right', Direction.DOWN: 'down', Direction.LEFT: 'left'}
+
+    def __init__(
+            self,
+            assets: AssetRegistry,
+            level: int = 1,
+            score: int = 0,
+            rules: Rules | None = None,
+            view_size: (int, int) = (VIEW_GRID_WIDTH * PIXELS_PER_TILE, VIEW_GRID_HEIGHT * PIXELS_PER_TILE),
+            seed: int | None = None,
+            state: LevelState | None = None):
         super().__init__()
 
-        self.turns = 0
-        self.score = score
+        # every level is seeded so it can be replayed, state is one already set up from that seed
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.state = state or LevelState(level, score, rules, random.Random(self.seed))
+        self.assets = assets
+        # snapshots from before each move, and of the moves undone since
+        self._undo: deque = deque(maxlen=UNDO_LIMIT)
+        self._redo: [Snapshot] = []
+        width, height = self.state.rules.width, self.state.rules.height
+        self.camera = Camera(view_size, (width * PIXELS_PER_TILE, height * PIXELS_PER_TILE))
+        self._sprites: {PlayerState | EnemyState: Entity} = {}
+        # the slides of every entity, advanced in one pass
+        self.tweens = Tweens()
+        # the search running for the hint key, and the turn the hint on screen is for
+        self._hint: Future | None = None
+        self._hint_turn: int | None = None
+        self._window: (Point2D | None, int) = (None, 0)
+        # the recorded waits to repeat instead of the slides still running, set while a replay plays
+        self.waits: {int: (int, ...)} | None = None
+        font = assets.font('resources/font/Pixeltype.ttf', FONT_SIZE)
         self.score_hud = TextSprite(
             f'{self.score}',
-            pygame.font.Font('resources/font/Pixeltype.ttf', FONT_SIZE),
+            font,
             'white',
             'topleft',
             (0, 0)
         )
-        wood = pygame.image.load('resources/img/tiles/wood-floor.png').convert()
-        self.background = pygame.Surface((wood.get_width() * 10, wood.get_height() * 10))
-        for i in range(10):
-            for j in range(10):
-                self.background.blit(wood, (i * PIXELS_PER_TILE, j * PIXELS_PER_TILE))
-
-        self.add(Player())
-        for i in range(round(math.log(level + 1, 2))):
-            location = Point2D(random.randrange(8), random.randrange(8))
-
-            while location in [e.location for e in self._children]:
-                location = Point2D(random.randrange(8), random.randrange(8))
-            enemy = Enemy('resources/img/sprites/goblin.png')
-            enemy.location = location
-            self.add(enemy)
+        self.background = TileMap(floor(width, height), assets, camera=self.camera)
+
+        self.add(Player(self.state.player, assets, self.camera, self.tweens), 'player')
+        for enemy in self.state.enemies:
+            self.add(Enemy(enemy, 'resources/img/sprites/goblin.png', assets, self.camera, self.tweens))
+        self.camera.follow(self.player().apparent_location())
         self.multiplier_hud = TextSprite(
-            f'x{self.player().multiplier}',
-            pygame.font.Font('resources/font/Pixeltype.ttf', FONT_SIZE),
+            f'x{self.state.player.multiplier}',
+            font,
             'white',
-            'bottomleft'
+            'bottomleft',
+            (0, view_size[1])
         )
+        # the background and HUD are not children, they are only drawn. The HUD needs a parent so its redraws
+        # reach the dirty list.
+        self.hint_hud = TextSprite('', font, 'white', 'topright', (view_size[0], 0))
+        self.score_hud.parent = self
+        self.multiplier_hud.parent = self
+        self.hint_hud.parent = self
+        self._queue.add(self.background, Layer.BACKGROUND)
+        self._queue.add(self.score_hud, Layer.HUD)
+        self._queue.add(self.multiplier_hud, Layer.HUD)
+        self._queue.add(self.hint_hud, Layer.HUD)
+
+    def enter(self):
         pygame.mouse.set_visible(False)
 
-    def handle(self, event: pygame.event.Event):
-        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-            self.exit_code = self.LOST
+    @property
+    def score(self) -> int:
+        return self.state.score
 
-        super().handle(event)
+    @property
+    def turns(self) -> int:
+        return self.state.turns
 
-    @staticmethod
-    def in_bounds(point):
-        return Point2D(0, 0) <= point <= Point2D(7, 7)
+    def subscriptions(self) -> tuple:
+        return (
+            (pygame.KEYDOWN, self.leave, pygame.K_ESCAPE),
+            (pygame.KEYDOWN, lambda event: self.undo(), pygame.K_z),
+            (pygame.KEYDOWN, lambda event: self.redo(), pygame.K_y),
+            (pygame.KEYDOWN, lambda event: self.hint(), pygame.K_h),
+        )
 
-    def entity_at(self, point) -> Entity | None:
-        for e in self._children:
-            if e.location == point:
-                return e
-        return None
+    def leave(self, event: pygame.event.Event):
+        self.exit_code = self.LOST
+
+    def hint(self) -> bool:
+        """
+        Starts searching for the best move in a worker process, it is shown once found
+        """
+        if self._hint is not None or not self.state.player_turn:
+            return False
+        self._hint = HINTS.request(self.state)
+        self._hint_turn = self.state.turns
+        return True
+
+    def checkpoint(self, snapshot: Snapshot):
+        """
+        Records the state from before a move so it can be undone
+        """
+        self._undo.append(snapshot)
+        self._redo.clear()
+
+    def undo(self) -> bool:
+        if not self._undo or not self.state.player_turn or self.player().moving():
+            return False
+        self._redo.append(self.state.snapshot())
+        self.restore(self._undo.pop())
+        return True
+
+    def redo(self) -> bool:
+        if not self._redo or not self.state.player_turn or self.player().moving():
+            return False
+        self._undo.append(self.state.snapshot())
+        self.restore(self._redo.pop())
+        return True
+
+    def restore(self, snapshot: Snapshot):
+        """
+        Puts the level back to snapshot, bringing back the sprites of enemies slain since and dropping those
+        of enemies it does not have
+        """
+        self.state.restore(snapshot)
+        enemies = set(self.state.enemies)
+        for sprite in self.of_type(Enemy):
+            if sprite.actor not in enemies:
+                self.remove(sprite)
+        for enemy in self.state.enemies:
+            if enemy not in self._sprites:
+                self.add(Enemy(enemy, 'resources/img/sprites/goblin.png', self.assets, self.camera, self.tweens))
+        for sprite in self._sprites.values():
+            self.tweens.stop(sprite.tween)
+            row = sprite.location.y
+            sprite.location = sprite.actor.location
+            if sprite.location.y != row:
+                self.restack(sprite)
+        self.player().buffer.clear()
+        self._window = (None, 0)
+        self.camera.follow(self.player().apparent_location())
+        self.invalidate()
+
+    def add(self, child: Scene, role: str | None = None):
+        super().add(child, role)
+        if isinstance(child, Entity):
+            self._sprites[child.actor] = child
+
+    def remove(self, child: Scene | int):
+        child = super().remove(child)
+        if isinstance(child, Entity):
+            del self._sprites[child.actor]
+            self.invalidate(child.bounds())
+        return child
 
     def player(self) -> Player | None:
-        for e in self._children:
-            if type(e) == Player:
-                return e
+        return self.role('player')
 
-    def draw(self, surface, time_increment):
-        surface.blit(self.background, ORIGIN)
-        super().draw(surface, time_increment)
-        self.multiplier_hud.rect.bottomleft = (0, surface.get_height())
-        self.multiplier_hud.set_text(f'x{self.player().multiplier}')
-        surface.blit(self.multiplier_hud.image, self.multiplier_hud.rect)
+    def waiting(self) -> {EnemyState}:
+        """
+        The enemies that sit this turn out, those still sliding from their last step
+        """
+        if self.waits is not None:
+            return {self.state.enemies[i] for i in self.waits.get(self.state.turns, ())}
+        if not self.tweens:
+            return set()
+        return {enemy.actor for enemy in self.of_type(Enemy) if enemy.moving()}
 
+    def active_children(self) -> [Scene]:
+        """
+        The entities within the activity radius of the player, all children when the radius covers the arena
+        """
+        radius = self.state.rules.activity_limit()
+        if radius is None:
+            return self.children()
+        occupancy = self.state.occupancy
+        location = self.state.player.location
+        if self._window[0] != location:
+            x, y = location
+            self._window = (location, occupancy.window(x - radius, y - radius, x + radius, y + radius))
+        return [self._sprites[occupancy.at(cell)] for cell in occupancy.cells(self._window[1] & occupancy.mask())]
+
+    def animating(self) -> bool:
+        # the enemies still have to take their turn once the player has moved, and a pending hint is polled
+        return not self.state.player_turn or self._hint is not None or super().animating()
+
+    def advance(self, time_increment):
+        self.tweens.advance(time_increment)
+        super().advance(time_increment)
+        if self.camera.follow(self.player().apparent_location()):
+            self.invalidate()
+        self.multiplier_hud.set_text(f'x{self.state.player.multiplier}')
         self.score_hud.set_text(f'{self.score}')
-        surface.blit(self.score_hud.image, self.score_hud.rect)
+        if self._hint is not None and self._hint.done():
+            hint, self._hint = self._hint, None
+            if not hint.cancelled() and hint.exception() is None and self._hint_turn == self.state.turns:
+                self.hint_hud.set_text(f'hint: {self.HINT_NAMES[hint.result().move]}')
+        elif self._hint is None and (self._hint_turn != self.state.turns or not self.state.player_turn):
+            # the hint is for a turn that is taken, or undone
+            self.hint_hud.set_text('')
+
+    def draw(self, surface: pygame.Surface):
+        # only what the camera sees, rows come from the render queue and columns are checked per entity
+        left, top, right, bottom = self.camera.cells()
+        if left <= 0 and top <= 0 and right >= self.state.rules.width - 1 and bottom >= self.state.rules.height - 1:
+            super().draw(surface)
+            return
+        for drawable in self._queue.rows(Layer.BACKGROUND):
+            drawable.draw(surface)
+        for layer in (Layer.SHADOWS, Layer.SPRITES):
+            for drawable in self._queue.rows(layer, top, bottom):
+                if left <= drawable.location.x <= right:
+                    drawable.draw(surface)
+        for drawable in self._queue.rows(Layer.HUD):
+            drawable.draw(surface)
 
     def update(self):
         super().update()
-        if self.player().moving() or self.player().turn:
+        if self.player().moving() or self.state.player_turn:
             return
 
-        for enemy in self._children:
-            if enemy == self.player():
-                continue
-
-            if enemy.health < 1:
-                self.score += self.player().multiplier
-                self.player().multiplier *= enemy.multiplier
+        self.state.enemy_phase(self.waiting())
+        alive = set(self.state.enemies)
+        for enemy in self.of_type(Enemy):
+            if enemy.actor not in alive:
                 self.remove(enemy)
-                break
-
-            if enemy.moving():
-                continue
-
-            enemy.move(self.player().location)
-
-        if len(self._children) <= 1:
-            self.exit_code = Level.WON
-
-        if self.player().multiplier < 1:
-            self.exit_code = Level.LOST
+            else:
+                enemy.follow()
 
-        self.turns += 1
-        self.player().turn = True
+        if (status := self.state.status()) != LevelState.ONGOING:
+            self.exit_code = status
 
 
 class TextSprite(Scene):
     def __init__(self, text='', font=None, color='black', anchor='center', pos=ORIGIN):
         super().__init__()
 
+        self.layer = Layer.HUD
         self.__font = font
         self.__text = text
         self.__color = color
         self.__anchor = anchor
-        self.image = self.__font.render(self.__text, False, self.__color)
+        self.image = self.rasterize()
         self.rect = self.image.get_rect(**{anchor: pos})
 
-    def draw(self, surface, time_increment):
+    def draw(self, surface):
         surface.blit(self.image, self.rect)
 
     def set_text(self, new_text: str):
+        if new_text == self.__text:
+            return
         self.__text = new_text
         self.render()
 
     def set_color(self, new_color):
+        if new_color == self.__color:
+            return
         self.__color = new_color
         self.render()
 
     def set_font(self, new_font):
+        if new_font is self.__font:
+            return
         self.__font = new_font
         self.render()
 
+    def rasterize(self) -> pygame.Surface:
+        return TEXT_CACHE.render(self.__font, self.__text, self.__color)
+
     def render(self):
         rect_anchor = {self.__anchor: getattr(self.rect, self.__anchor)}
-        self.image = self.__font.render(self.__text, False, self.__color)
+        self.invalidate(self.rect)
+        self.image = self.rasterize()
         self.rect = self.image.get_rect(**rect_anchor)
+        self.invalidate(self.rect)
 
 
 class Entity(Scene):
-    def __init__(self, image_path: str):
+    def __init__(
+            self,
+            actor: PlayerState | EnemyState,
+            image_path: str,
+            assets: AssetRegistry,
+            camera: Camera | None = None,
+            tweens: Tweens | None = None):
         super().__init__()
 
-        self.image = pygame.image.load(image_path).convert_alpha()
-        self.shadow = pygame.image.load('resources/img/sprites/1x1-shadow.png').convert_alpha()
-        self.multiplier = 1
-        self.move_dir = Direction.ZERO
+        self.actor = actor
+        self.camera = camera
+        self.location = actor.location
+        self.image = assets.image(image_path)
+        self.shadow = assets.image('resources/img/sprites/1x1-shadow.png')
+        # how far, in cells, the sprite is drawn from its cell while it slides there
+        self.tween = Tween()
+        # an entity outside a level advances its own slide
+        self._tweens = tweens if tweens is not None else Tweens()
+        self._own_tweens = tweens is None
+        self.layer = Layer.SPRITES
+        self._shadow = Shadow(self)
+
+    def advance(self, time_increment: int):
+        image = self.image
+        self.step(time_increment)
+        tween = self.tween
+        if tween.changed:
+            self.invalidate(self.bounds(image, tween.last_x, tween.last_y))
+        elif self.image is not image:
+            self.invalidate(self.bounds(image))
+        else:
+            return
+        self.invalidate(self.bounds())
 
-    def draw(self, surface: pygame.Surface, time_increment: int):
-        if abs(self.move_dir) < Direction.EPSILON:
-            self.move_dir = Direction.ZERO
-            self.location = self.location.__round__()
-        move_increment = self.move_dir * (time_increment / 1000 * 20)
-        self.move_dir -= move_increment
-        surface.blit(self.shadow, self.shadow.get_rect(center=tuple(self.apparent_location())))
-        surface.blit(self.image, self.image.get_rect(midbottom=tuple(self.apparent_location())))
+    def step(self, time_increment: int):
+        if self._own_tweens:
+            self._tweens.advance(time_increment)
 
-    def apparent_location(self) -> Point2D:
-        return (self.location + self.move_dir + Point2D(0.5, 0.5)) * PIXELS_PER_TILE
+    def draw(self, surface: pygame.Surface):
+        surface.blit(self.image, self.image.get_rect(midbottom=self.screen_location()))
 
-    def move(self, direction: Point2D):
-        raise NotImplementedError
+    def drawables(self) -> tuple:
+        return (self._shadow, Layer.SHADOWS), (self, self.layer)
 
-    def handle(self, event: pygame.event.Event):
-        return
+    def bounds(
+            self,
+            image: pygame.Surface | None = None,
+            dx: float | None = None,
+            dy: float | None = None) -> pygame.Rect:
+        """
+        The area of the screen covered by the entity's sprite and shadow, or by image drawn at the slide
+        offset (dx, dy)
+        """
+        location = self.screen_location(dx, dy)
+        return (image or self.image).get_rect(midbottom=location).union(self.shadow.get_rect(center=location))
+
+    def apparent_location(self, dx: float | None = None, dy: float | None = None) -> (float, float):
+        if dx is None:
+            dx, dy = self.tween.x, self.tween.y
+        return (self.location[0] + dx + 0.5) * PIXELS_PER_TILE, (self.location[1] + dy + 0.5) * PIXELS_PER_TILE
+
+    def screen_location(self, dx: float | None = None, dy: float | None = None) -> (float, float):
+        x, y = self.apparent_location(dx, dy)
+        if self.camera is None:
+            return x, y
+        rect = self.camera.rect
+        return x - rect.x, y - rect.y
 
     def update(self):
         return
 
-    def take_damage(self, amount: int):
-        raise NotImplementedError
+    def moving(self) -> bool:
+        return self.tween.active
 
-    def moving(self):
-        return self.move_dir != Direction.ZERO
+    def animating(self) -> bool:
+        return self.moving()
+
+    def follow(self) -> bool:
+        """
+        Starts sliding to the actor's cell if the rules moved it, returns whether it did
+        """
+        if self.actor.location == self.location:
+            return False
+        # slide from wherever the sprite is drawn, which is not its cell if the last slide is still running
+        tween = self.tween
+        location = self.actor.location
+        self._tweens.start(tween, self.location[0] + tween.x - location[0], self.location[1] + tween.y - location[1],
+                           MOVE_DURATION)
+        row = self.location.y
+        self.location = self.actor.location
+        if self.parent is not None and self.location.y != row:
+            self.parent.restack(self)
+        return True
+
+
+class Shadow:
+    """
+    An entity's shadow, drawn in its own layer beneath every sprite
+    """
+    __slots__ = 'entity',
+
+    def __init__(self, entity: Entity):
+        self.entity = entity
+
+    @property
+    def location(self) -> Point2D:
+        return self.entity.location
+
+    def draw(self, surface: pygame.Surface):
+        shadow = self.entity.shadow
+        surface.blit(shadow, shadow.get_rect(center=self.entity.screen_location()))
 
 
 class Player(Entity):
-    def __init__(self):
-        super().__init__('resources/img/sprites/player/front.png')
-        self.location.x = 4
-        self.location.y = 4
-        self.turn = True
-        self.multiplier = 2
-        self.parent = None
-        self.buffer: [pygame.Event] = []
+    KEYS = {
+        pygame.K_UP: Direction.UP,
+        pygame.K_DOWN: Direction.DOWN,
+        pygame.K_LEFT: Direction.LEFT,
+        pygame.K_RIGHT: Direction.RIGHT,
+    }
+
+    def __init__(
+            self,
+            actor: PlayerState,
+            assets: AssetRegistry,
+            camera: Camera | None = None,
+            tweens: Tweens | None = None):
+        super().__init__(actor, 'resources/img/sprites/player/front.png', assets, camera, tweens)
+        self.buffer = InputQueue(INPUT_BUFFER_SIZE, INPUT_BUFFER_POLICY)
         self.anim = AnimationController({
             'walk_down': Animation([
-                pygame.image.load('resources/img/sprites/player/front2.png'),
-                pygame.image.load('resources/img/sprites/player/front3.png'),
-                pygame.image.load('resources/img/sprites/player/front4.png'),
-                pygame.image.load('resources/img/sprites/player/front5.png'),
-                pygame.image.load('resources/img/sprites/player/front6.png'),
-                pygame.image.load('resources/img/sprites/player/front.png'),
+                assets.image('resources/img/sprites/player/front2.png'),
+                assets.image('resources/img/sprites/player/front3.png'),
+                assets.image('resources/img/sprites/player/front4.png'),
+                assets.image('resources/img/sprites/player/front5.png'),
+                assets.image('resources/img/sprites/player/front6.png'),
+                assets.image('resources/img/sprites/player/front.png'),
             ], framerate=20)
         }, 'walk_down')
 
+    def subscriptions(self) -> tuple:
+        return tuple((pygame.KEYDOWN, self.handle, key) for key in self.KEYS)
+
     def update(self):
-        if not self.moving() and self.turn and len(self.buffer) > 1:
+        if not self.moving() and self.parent.state.player_turn and len(self.buffer):
             self.handle(self.buffer.pop())
 
     def handle(self, event):
-        if event.type != pygame.KEYDOWN:
+        if event.type != pygame.KEYDOWN or (direction := self.KEYS.get(event.key)) is None:
             return
-        if self.moving() or not self.turn:
-            self.buffer.append(event)
-
-        if event.key == pygame.K_UP:
-            self.move(Direction.UP)
-        if event.key == pygame.K_DOWN:
-            self.move(Direction.DOWN)
-        if event.key == pygame.K_LEFT:
-            self.move(Direction.LEFT)
-        if event.key == pygame.K_RIGHT:
-            self.move(Direction.RIGHT)
+        # moves pressed while the last one plays out are taken in order once the player can act again
+        if self.moving() or not self.parent.state.player_turn:
+            self.buffer.push(event)
+            return
+
+        self.move(direction, getattr(event, 'arrived', None))
 
         # debug controls
         # if event.key == pygame.K_SPACE:
-        #     self.turn = False
+        #     self.parent.state.player_turn = False
         # if event.key == pygame.K_RETURN:
         #     self.parent.exit_code = 2 # Level.WON
         # if event.key == pygame.K_TAB:
-        #     self.multiplier *= 10
+        #     self.actor.multiplier *= 10
 
-    def move(self, direction: Point2D):
+    def move(self, direction: Point2D, arrived: float | None = None):
         if self.moving():
             return
 
-        target = self.location + direction
-
-        if not self.parent.in_bounds(target):
+        state = self.parent.state
+        before = state.snapshot()
+        if not state.player_move(direction):
             return
-
-        if entity := self.parent.entity_at(target):
-            entity.take_damage(self.multiplier)
-        else:
+        self.parent.checkpoint(before)
+        if self.follow():
             self.anim.play('walk_down')
-            self.move_dir = self.location - target
-            self.location = target
+            if arrived is not None:
+                LATENCY.acted(arrived)
 
-        self.turn = False
+    def animating(self) -> bool:
+        return self.moving() or not self.anim.active_anim.stopped
 
-    def take_damage(self, amount: int):
-        self.multiplier -= amount
-
-    def draw(self, surface: pygame.Surface, time_increment: int):
+    def step(self, time_increment: int):
         self.image = self.anim.frame_advance(time_increment)
-        super().draw(surface, time_increment)
+        super().step(time_increment)
 
 
 class Enemy(Entity):
-    def __init__(self, image_path):
-        super().__init__(image_path)
-        self.multiplier = 2
-        self.damage = 1
-        self.health = 8
-
-    def move(self, location):
-        path = self.a_star(location)
-        if not path:
-            return
-
-        if (type(self.parent) == Level) and (entity := self.parent.entity_at(path[0])):
-            if type(entity) == Player and random.random() < 0.1:
-                entity.take_damage(self.damage)
-        else:
-            self.move_dir = self.location - path[0]
-            self.location = path[0]
-
-    @staticmethod
-    def reconstruct_path(came_from, current):
-        total_path = [current]
-        while current in came_from.keys():
-            current = came_from[current]
-            total_path.insert(0, current)
-        return total_path[2:]
-
-    def a_star(self, goal: Point2D) -> [Point2D]:
-        # possible nodes = [Point(i, j) for i in range(8) for j in range(8)]
-        open_set = [self.location]
-
-        came_from = dict.fromkeys([Point2D(i, j) for i in range(8) for j in range(8)], None)
-
-        g_score = dict.fromkeys([Point2D(i, j) for i in range(8) for j in range(8)], float('inf'))
-        g_score[self.location] = 0
-
-        f_score = dict.fromkeys([Point2D(i, j) for i in range(8) for j in range(8)], float('inf'))
-        f_score[self.location] = self.location.dist(goal)
-
-        while len(open_set) > 0:
-            current = min(open_set, key=lambda x: f_score[x])
-            if current == goal:
-                return self.reconstruct_path(came_from, current)
-
-            open_set.remove(current)
-            for neighbor in current.neighbors():
-                if neighbor not in g_score.keys() \
-                        or type(self.parent.entity_at(neighbor)) == Enemy:
-                    continue
-
-                tentative_g_score = g_score[current] + current.dist(neighbor)
-                if tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + neighbor.dist(goal)
-                    if neighbor not in open_set:
-                        open_set.append(neighbor)
-
-        return None
-
-    def take_damage(self, amount: int):
-        self.health -= amount
+    pass
@@ -0,0 +1,57 @@
+import time
+
+import pygame
+
+from constants import TARGET_FRAMERATE
+
+
+class FrameScheduler:
+    """
+    Paces the event loop. While the scene is animating, frames are capped at the target framerate.
+    Otherwise the loop sleeps in pygame.event.wait until input arrives or the scene's next deadline
+    passes, so an idle title screen or a level waiting for a keypress uses no CPU. Input is left for
+    poll() at the top of the next frame, which also estimates when each event arrived.
+    """
+    def __init__(self, framerate: int = TARGET_FRAMERATE):
+        self.framerate = framerate
+        self._clock = pygame.time.Clock()
+        self._woken_by: pygame.event.Event | None = None
+        # the frame boundary nothing still queued can have arrived before: the last poll or the end of a wait
+        self._since = time.perf_counter()
+
+    def next_frame(self, scene, busy: bool = False) -> int:
+        """
+        Waits for the next frame and returns the milliseconds of animation time it covers. Time spent
+        blocked while idle is not reported as animation time. A busy loop, like one playing a replay, is
+        paced as if the scene was animating, since nothing would wake it from an idle wait.
+        """
+        if busy or scene.animating():
+            return self._clock.tick(self.framerate)
+
+        deadline = scene.next_deadline()
+        # a timeout of 0 blocks until the next event
+        event = pygame.event.wait(max(deadline, 1) if deadline is not None else 0)
+        self._since = time.perf_counter()
+        self._clock.tick()
+        if event.type != pygame.NOEVENT:
+            # waiting takes the event off the queue, it is handed back first by poll()
+            self._woken_by = event
+        return 0
+
+    def poll(self) -> [pygame.event.Event]:
+        """
+        The events that arrived since the last poll, in order. Each is stamped with the time.perf_counter()
+        reading it arrived at as event.arrived: from SDL's own timestamp where pygame passes it on, otherwise
+        the previous frame boundary, the latest time known to be before it arrived.
+        """
+        events = pygame.event.get()
+        now, ticks = time.perf_counter(), pygame.time.get_ticks()
+        if self._woken_by is not None:
+            events.insert(0, self._woken_by)
+            self._woken_by = None
+        for event in events:
+            # SDL stamps events in the milliseconds of pygame.time.get_ticks()
+            timestamp = getattr(event, 'timestamp', None)
+            event.arrived = self._since if timestamp is None else now - (ticks - timestamp) / 1000
+        self._since = now
+        return events
@@ -0,0 +1,384 @@
+"""
+Searches the turn rules for the best move, for the in game hint key and as a bot to measure difficulty.
+
+    python src/solver.py --level 5 --seed 1 --budget 100    # play a level, one budgeted search per move
+    python src/batch.py --policy expectimax --games 200      # fixed depth, so runs are reproducible
+
+The search is expectimax: the player's moves are max nodes, and every enemy attack on the player is a
+chance node that hits with the rules' hit chance. Positions are simulated with LevelState itself, only
+the attack rolls are taken over, so the search always plays by the game's rules. It deepens one ply at
+a time until the millisecond budget runs out and answers with the deepest search that finished. Searched
+positions are kept in a transposition table keyed by a Zobrist hash of the board, which also carries
+results over from one move's search to the next.
+"""
+from __future__ import annotations
+
+import itertools
+import random
+import time
+from concurrent.futures import Future
+
+from constants import HINT_BUDGET
+from engine import DIRECTIONS, EnemyState, LevelState, PlayerState, Rules
+from occupancy import Occupancy
+from utils import Point2D
+
+
+class Position:
+    """
+    The part of a level the search needs, with the player to move. Enemies are (slot, location, health),
+    slot being their index in spawn order when the search started.
+    """
+    __slots__ = 'player', 'multiplier', 'score', 'turns', 'enemies'
+
+    def __init__(self, player: Point2D, multiplier: int, score: int, turns: int, enemies: tuple):
+        self.player = player
+        self.multiplier = multiplier
+        self.score = score
+        self.turns = turns
+        self.enemies = enemies
+
+    @classmethod
+    def of(cls, state: LevelState) -> Position:
+        enemies = tuple((slot, enemy.location, enemy.health) for slot, enemy in enumerate(state.enemies))
+        return cls(state.player.location, state.player.multiplier, state.score, state.turns, enemies)
+
+
+class SearchResult:
+    def __init__(self, move: Point2D, value: float, depth: int, nodes: int, elapsed: float):
+        self.move = move
+        # expected points gained from here on, losing counting as the solver's loss penalty
+        self.value = value
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+
+class _Board(LevelState):
+    """
+    A LevelState set up from a Position instead of spawning a level. Attacks on the player are recorded
+    and resolved from the outcomes the search passes in, rather than rolled.
+    """
+    def __init__(self, position: Position, rules: Rules, level: int, enemy_stats: [(int, int)], hits: (bool, ...)):
+        # everything LevelState.__init__ sets, but placed rather than spawned
+        self.rules = rules
+        self.rng = None
+        self.level = level
+        self.score = position.score
+        self.turns = position.turns
+        self.player_turn = True
+        self.history = None
+        self.occupancy = Occupancy(rules.width, rules.height)
+        self.player = PlayerState(position.player, position.multiplier)
+        self.occupancy.add(self.player, self.player.location)
+        self.enemies = []
+        for slot, location, health in position.enemies:
+            multiplier, damage = enemy_stats[slot]
+            enemy = EnemyState(location, multiplier, health, damage)
+            enemy.slot = slot
+            self.enemies.append(enemy)
+            self.occupancy.add(enemy, location)
+        self.hits = hits
+        self.attacks = 0
+
+    def attack(self, enemy: EnemyState):
+        if self.attacks < len(self.hits) and self.hits[self.attacks]:
+            self.player.multiplier -= enemy.damage
+        self.attacks += 1
+
+    def position(self) -> Position:
+        enemies = tuple((enemy.slot, enemy.location, enemy.health) for enemy in self.enemies)
+        return Position(self.player.location, self.player.multiplier, self.score, self.turns, enemies)
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class Solver:
+    """
+    Expectimax search over one level's turn rules. A solver keeps its transposition table between
+    searches, for as long as it is asked about the same level.
+    """
+    # points a lost level is worth, it ends the run
+    LOSS_PENALTY = 100.0
+    # points per turn, taken or estimated to be still needed to clear the level at the search horizon
+    TURN_COST = 0.25
+    TABLE_SIZE = 1 << 18
+
+    def __init__(self, rules: Rules | None = None, seed: int = 0):
+        self.rules = rules or Rules()
+        self.nodes = 0
+        self._rng = random.Random(seed)
+        cells = self.rules.width * self.rules.height
+        self._player_keys = [self._rng.getrandbits(64) for _ in range(cells)]
+        self._enemy_keys: [[int]] = []
+        self._value_keys: {(str, int): int} = {}
+        self._table: {int: (int, float, Point2D | None)} = {}
+        self._fights: {tuple: float} = {}
+        self._level = None
+        self._deadline: float | None = None
+
+    def search(self, state: LevelState, budget: float | None = None, depth: int | None = None) -> SearchResult:
+        """
+        The best move for the player in state, searching for up to budget milliseconds and at most depth
+        plies, which must be at least one. The first ply is always searched in full, so a move comes back
+        however short the budget.
+        """
+        if budget is None and depth is None:
+            raise ValueError('a search needs a time budget, a depth or both')
+        if depth is not None and depth < 1:
+            raise ValueError(f'a search needs a depth of at least one ply, not {depth}')
+        stats = [(enemy.multiplier, enemy.damage) for enemy in state.enemies]
+        if self._level != (state.level, stats):
+            self._level = (state.level, stats)
+            self._table.clear()
+            self._fights.clear()
+        self._enemy_stats = stats
+        self._number = state.level
+        while len(self._enemy_keys) < len(stats):
+            self._enemy_keys.append([self._rng.getrandbits(64) for _ in self._player_keys])
+        if len(self._table) > self.TABLE_SIZE:
+            self._table.clear()
+
+        position = Position.of(state)
+        start = time.perf_counter()
+        self.nodes = 0
+        self._deadline = None
+        best = None
+        for ply in itertools.count(1):
+            if depth is not None and ply > depth:
+                break
+            try:
+                value, move = self._max(position, ply)
+            except _OutOfTime:
+                break
+            best = SearchResult(move, value, ply, self.nodes, time.perf_counter() - start)
+            if budget is not None:
+                self._deadline = start + budget / 1000
+                if time.perf_counter() >= self._deadline:
+                    break
+        best.nodes = self.nodes
+        best.elapsed = time.perf_counter() - start
+        return best
+
+    def key(self, position: Position) -> int:
+        """
+        Zobrist hash of position: the xor of a random key for the player's cell, every enemy's cell, and each
+        of the numbers that tell positions apart
+        """
+        width = self.rules.width
+        key = self._player_keys[position.player[1] * width + position.player[0]]
+        key ^= self._value_key('multiplier', position.multiplier) ^ self._value_key('turns', position.turns)
+        for slot, location, health in position.enemies:
+            key ^= self._enemy_keys[slot][location[1] * width + location[0]] ^ self._value_key(slot, health)
+        return key
+
+    def _value_key(self, kind, value: int) -> int:
+        key = self._value_keys.get((kind, value))
+        if key is None:
+            key = self._value_keys[(kind, value)] = self._rng.getrandbits(64)
+        return key
+
+    def _max(self, position: Position, depth: int) -> (float, Point2D | None):
+        """
+        The expected points position is worth from here, with the player choosing, and the move to get them
+        """
+        key = self.key(position)
+        entry = self._table.get(key)
+        if entry is not None and entry[0] >= depth:
+            return entry[1], entry[2]
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _OutOfTime()
+        self.nodes += 1
+
+        best_value, best_move = None, None
+        for move in DIRECTIONS:
+            if not 0 <= position.player[0] + move[0] < self.rules.width \
+                    or not 0 <= position.player[1] + move[1] < self.rules.height:
+                continue
+            # every turn taken costs the same as one still needed at the horizon, so stalling is never free
+            value = -self.TURN_COST
+            for chance, child in self._outcomes(position, move):
+                value += chance * (child.score - position.score + self._value(child, depth - 1))
+            if best_value is None or value > best_value:
+                best_value, best_move = value, move
+        self._table[key] = (depth, best_value, best_move)
+        return best_value, best_move
+
+    def _value(self, position: Position, depth: int) -> float:
+        if position.multiplier < 1:
+            return -self.LOSS_PENALTY
+        if not position.enemies:
+            return self.rules.win_bonus(self._number, position.turns)
+        if depth == 0:
+            return self._estimate(position)
+        return self._max(position, depth)[0]
+
+    def _estimate(self, position: Position) -> float:
+        """
+        The value of a position at the search horizon. Clearing the level takes at least the walk to the nearest
+        enemy and the attacks on every enemy, and those fights carry a chance of losing. Counting that chance
+        here keeps the search from putting fights off past its horizon.
+        """
+        x, y = position.player
+        # fought nearest first, the weakest first when as near
+        order = sorted((abs(location[0] - x) + abs(location[1] - y), health, slot)
+                       for slot, location, health in position.enemies)
+        walk = order[0][0] - 1
+        enemies = tuple((health, *self._enemy_stats[slot]) for _, health, slot in order)
+        multiplier = position.multiplier
+        attacks = 0
+        for health, gain, _ in enemies:
+            attacks += max(1, -(-health // multiplier))
+            multiplier *= gain
+        return -self.TURN_COST * (walk + attacks) - self.LOSS_PENALTY * self._fight(enemies, position.multiplier)
+
+    def _fight(self, enemies: ((int, int, int), ...), multiplier: int) -> float:
+        """
+        The chance of losing when fighting enemies, (health, multiplier, damage), one after the other, every
+        attack that does not slay an enemy answered with one hit roll
+        """
+        if multiplier < 1:
+            return 1.0
+        if not enemies:
+            return 0.0
+        key = (enemies, multiplier)
+        lost = self._fights.get(key)
+        if lost is None:
+            (health, gain, damage), rest = enemies[0], enemies[1:]
+            if health - multiplier < 1:
+                lost = self._fight(rest, multiplier * gain)
+            else:
+                enemies = ((health - multiplier, gain, damage),) + rest
+                hit = self.rules.hit_chance
+                lost = hit * self._fight(enemies, multiplier - damage) + (1 - hit) * self._fight(enemies, multiplier)
+            self._fights[key] = lost
+        return lost
+
+    def _outcomes(self, position: Position, move: Point2D) -> [(float, Position)]:
+        """
+        Every way the turn can end after the player's move, with its chance. The turn is played once with
+        every attack missing to count the attacks, then again for each other combination of hits.
+        """
+        board = _Board(position, self.rules, self._number, self._enemy_stats, ())
+        board.player_move(move)
+        board.enemy_phase()
+        if not board.attacks:
+            return [(1.0, board.position())]
+
+        hit = self.rules.hit_chance
+        outcomes: {int: (float, Position)} = {}
+        for hits in itertools.product((False, True), repeat=board.attacks):
+            if any(hits):
+                board = _Board(position, self.rules, self._number, self._enemy_stats, hits)
+                board.player_move(move)
+                board.enemy_phase()
+            landed = sum(hits)
+            chance = hit ** landed * (1 - hit) ** (len(hits) - landed)
+            child = board.position()
+            key = self.key(child)
+            if key in outcomes:
+                chance += outcomes[key][0]
+            outcomes[key] = (chance, child)
+        return list(outcomes.values())
+
+
+def policy(state: LevelState, rng: random.Random, depth: int = 2) -> Point2D:
+    """
+    A batch.py policy, searching to a fixed depth with a fresh table so a seeded run always plays the same
+    """
+    return Solver(state.rules).search(state, depth=depth).move
+
+
+def _hint(state: LevelState, budget: float) -> SearchResult:
+    # the worker keeps its solver while the rules stay the same, so its table carries over between hints
+    global _solver
+    if _solver is None or _solver.rules.__dict__ != state.rules.__dict__:
+        _solver = Solver(state.rules)
+    return _solver.search(state, budget)
+
+
+_solver: Solver | None = None
+
+
+class HintService:
+    """
+    Runs searches in a worker process, so a search neither stalls the event loop nor competes with it
+    for the interpreter. The worker starts on the first request and keeps its solver between requests.
+    """
+    def __init__(self, budget: float = HINT_BUDGET):
+        self.budget = budget
+        self._executor = None
+
+    def request(self, state: LevelState) -> Future:
+        """
+        Starts searching state for the player's best move, the future's result is a SearchResult
+        """
+        if self._executor is None:
+            # imported with the first hint rather than when the game starts
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # a fresh interpreter rather than a fork of one running SDL and the preloading thread
+            context = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        return self._executor.submit(_hint, _searchable(state), self.budget)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _searchable(state: LevelState) -> LevelState:
+    """
+    A copy of state holding only what a search reads, cheap to send to the worker
+    """
+    copy = LevelState.__new__(LevelState)
+    copy.rules = state.rules
+    copy.level = state.level
+    copy.score = state.score
+    copy.turns = state.turns
+    copy.player = PlayerState(state.player.location, state.player.multiplier)
+    copy.enemies = [EnemyState(e.location, e.multiplier, e.health, e.damage) for e in state.enemies]
+    return copy
+
+
+HINTS = HintService()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--level', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=float, default=HINT_BUDGET, help='milliseconds per move')
+    parser.add_argument('--depth', type=int, default=None, help='plies per move, unlimited by default')
+    args = parser.parse_args()
+
+    state = LevelState(args.level, 0, Rules(), random.Random(args.seed))
+    solver = Solver(state.rules)
+    nodes, elapsed, depths = 0, 0.0, []
+    while state.status() == LevelState.ONGOING and state.turns < state.rules.turn_limit:
+        result = solver.search(state, args.budget, args.depth)
+        nodes += result.nodes
+        elapsed += result.elapsed
+        depths.append(result.depth)
+        state.player_move(result.move)
+        state.enemy_phase()
+
+    status = ('ongoing', 'lost', 'won')[state.status()]
+    bonus = state.rules.win_bonus(args.level, state.turns) if state.status() == LevelState.WON else 0
+    print(f'level {args.level}: {status} in {state.turns} turns, score {state.score + bonus}')
+    print(f'{nodes} nodes in {elapsed:.2f}s ({nodes / elapsed:.0f} nodes/s), '
+          f'depth {min(depths)}-{max(depths)} (mean {sum(depths) / len(depths):.1f})')
+
+
+if __name__ == '__main__':
+    main()
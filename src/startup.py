@@ -0,0 +1,30 @@
+"""
+Times the way from launch to the first frame on screen: imports, SDL init, asset loading, opening the
+window and the first present. Printed once the title screen is up when STARTUP_REPORT is set.
+"""
+import time
+
+
+class StartupTimer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases: [(str, float)] = []
+        self._last = self.origin
+
+    def mark(self, phase: str):
+        """
+        Ends the named phase, it is timed from the end of the previous one
+        """
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def report(self) -> str:
+        lines = [f'{"startup":<16} {"ms":>8}']
+        lines += [f'{phase:<16} {duration:>8.2f}' for phase, duration in self.phases]
+        lines.append(f'{"first frame":<16} {(self._last - self.origin) * 1000:>8.2f}')
+        return '\n'.join(lines)
+
+
+# imported before anything else, so the imports of the game are timed from here
+STARTUP = StartupTimer()
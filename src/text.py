@@ -0,0 +1,36 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """
+    Bounded least recently used cache of rendered text surfaces, keyed by font, text and colour
+    """
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._surfaces: OrderedDict = OrderedDict()
+
+    def render(self, font: pygame.font.Font, text: str, color) -> pygame.Surface:
+        key = (font, text, _color_key(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self._surfaces[key] = font.render(text, False, color)
+        if len(self._surfaces) > self.capacity:
+            self._surfaces.popitem(last=False)
+        return surface
+
+
+def _color_key(color):
+    # pygame.Color is mutable and unhashable, strings and tuples are used as they are
+    return tuple(color) if isinstance(color, pygame.Color) else color
+
+
+TEXT_CACHE = TextCache()
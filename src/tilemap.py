@@ -0,0 +1,83 @@
+import pygame
+
+from assets import AssetRegistry
+from camera import Camera
+from constants import PIXELS_PER_TILE, TILE_CHUNK
+
+TILES = {
+    '.': 'resources/img/tiles/wood-floor.png',
+    '#': 'resources/img/tiles/stone-brick.png',
+    '%': 'resources/img/tiles/stone-brick-dark.png',
+}
+
+
+def floor(width: int, height: int) -> [str]:
+    """
+    A layout of plain floor, one string of tile characters per row
+    """
+    return ['.' * width] * height
+
+
+class TileMap:
+    """
+    Static tiles baked into chunks of TILE_CHUNK by TILE_CHUNK tiles. Chunks are cached by their tiles,
+    so identical chunks are baked once and shared by every map, level after level. Only chunks whose
+    tiles have never been seen before get baked when the layout changes. With a camera only the chunks
+    in its view are drawn.
+    """
+    _chunks: {tuple: pygame.Surface} = {}
+
+    def __init__(
+            self,
+            layout: [str],
+            assets: AssetRegistry,
+            chunk_size: int = TILE_CHUNK,
+            camera: Camera | None = None):
+        self.assets = assets
+        self.chunk_size = chunk_size
+        self.camera = camera
+        self.layout: (str,) = ()
+        self._grid: [[pygame.Surface]] = []
+        self.set_layout(layout)
+
+    def set_layout(self, layout: [str]):
+        layout = tuple(layout)
+        if layout == self.layout:
+            return
+        self.layout = layout
+        size = self.chunk_size
+        height, width = len(layout), max((len(row) for row in layout), default=0)
+        self._grid = [
+            [self._chunk(tuple(row[x:x + size] for row in layout[y:y + size])) for x in range(0, width, size)]
+            for y in range(0, height, size)
+        ]
+
+    def _chunk(self, tiles: (str,)) -> pygame.Surface:
+        chunk = self._chunks.get(tiles)
+        if chunk is None:
+            width = max(len(row) for row in tiles)
+            chunk = pygame.Surface((width * PIXELS_PER_TILE, len(tiles) * PIXELS_PER_TILE))
+            for y, row in enumerate(tiles):
+                for x, tile in enumerate(row):
+                    chunk.blit(self.assets.image(TILES[tile], alpha=False), (x * PIXELS_PER_TILE, y * PIXELS_PER_TILE))
+            self._chunks[tiles] = chunk
+        return chunk
+
+    def draw(self, surface: pygame.Surface):
+        if not self._grid:
+            return
+        span = self.chunk_size * PIXELS_PER_TILE
+        rows, columns = len(self._grid), len(self._grid[0])
+        if self.camera is None:
+            dx = dy = 0
+            first_row, last_row, first_column, last_column = 0, rows - 1, 0, columns - 1
+        else:
+            dx, dy = self.camera.offset
+            view = self.camera.rect
+            first_row, last_row = max(view.top // span, 0), min((view.bottom - 1) // span, rows - 1)
+            first_column, last_column = max(view.left // span, 0), min((view.right - 1) // span, columns - 1)
+        surface.blits([
+            (self._grid[y][x], (x * span + dx, y * span + dy))
+            for y in range(first_row, last_row + 1)
+            for x in range(first_column, last_column + 1)
+        ], doreturn=False)
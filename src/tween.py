@@ -0,0 +1,101 @@
+"""
+Time based tweens. A tween slides an offset back to zero over a fixed number of milliseconds, along an
+easing curve sampled once into a lookup table, so the motion looks the same at any framerate and a long
+frame finishes it instead of overshooting. The running tweens are advanced together in one pass per
+frame, updating their floats in place.
+"""
+import math
+from array import array
+
+# samples per easing table
+EASING_STEPS = 256
+
+
+def _table(curve) -> array:
+    return array('d', (curve(i / (EASING_STEPS - 1)) for i in range(EASING_STEPS)))
+
+
+EASINGS = {
+    'linear': _table(lambda u: u),
+    'out_quad': _table(lambda u: 1 - (1 - u) ** 2),
+    # the remaining distance decaying exponentially, the slide entities had before tweens
+    'out_exp': _table(lambda u: (1 - math.exp(-3.5 * u)) / (1 - math.exp(-3.5))),
+}
+
+
+class Tween:
+    """
+    A 2D offset easing to zero. The fields are plain floats read directly: x and y are the offset now,
+    last_x and last_y what it was before the last advance, changed whether that advance moved it.
+    """
+    __slots__ = 'x', 'y', 'last_x', 'last_y', 'start_x', 'start_y', 'elapsed', 'duration', 'table', 'active', \
+        'changed'
+
+    def __init__(self):
+        self.x = self.y = self.last_x = self.last_y = self.start_x = self.start_y = 0.0
+        self.elapsed = self.duration = 0
+        self.table = EASINGS['linear']
+        self.active = False
+        self.changed = False
+
+
+class Tweens:
+    """
+    The running tweens, advanced as one batch
+    """
+    def __init__(self):
+        self._active: [Tween] = []
+        self._changed: [Tween] = []
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def start(self, tween: Tween, x: float, y: float, duration: int, easing: str = 'out_exp'):
+        """
+        Slides tween from the offset (x, y) to zero over duration milliseconds
+        """
+        tween.x = tween.start_x = x
+        tween.y = tween.start_y = y
+        tween.elapsed = 0
+        tween.duration = duration
+        tween.table = EASINGS[easing]
+        if not tween.active:
+            tween.active = True
+            self._active.append(tween)
+
+    def stop(self, tween: Tween):
+        """
+        Ends tween at zero
+        """
+        tween.x = tween.y = 0.0
+        if tween.active:
+            tween.active = False
+            self._active.remove(tween)
+
+    def advance(self, time_increment: int):
+        for tween in self._changed:
+            tween.changed = False
+        if not time_increment:
+            self._changed = []
+            return
+        active = self._active
+        # a copy, stop() takes tweens out of the active list and their flags still have to be cleared
+        self._changed = active[:]
+
+        last = EASING_STEPS - 1
+        finished = False
+        for tween in active:
+            tween.last_x = tween.x
+            tween.last_y = tween.y
+            tween.changed = True
+            elapsed = tween.elapsed = tween.elapsed + time_increment
+            if elapsed >= tween.duration:
+                tween.x = tween.y = 0.0
+                tween.active = False
+                finished = True
+                continue
+            remaining = 1 - tween.table[int(elapsed * last / tween.duration)]
+            tween.x = tween.start_x * remaining
+            tween.y = tween.start_y * remaining
+        if finished:
+            self._active = [tween for tween in active if tween.active]
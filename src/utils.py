@@ -1,93 +1,105 @@
 import math
 
-from constants import SUBPIXEL
+from constants import POINT_INTERN_LIMIT, SUBPIXEL
 
 
 def sign(i):
     return i / abs(i) if i != 0 else 0
 
 
-class Point2D:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
+class Point2D(tuple):
+    """
+    Immutable 2D point stored as a plain (x, y) tuple so hashing runs in C. It only equals other
+    points, not plain tuples. Points with integer coordinates in [0, POINT_INTERN_LIMIT) are
+    interned, which lets grid lookups reuse the same instances and cache each cell's neighbors.
+    """
+    __slots__ = ()
 
-    def __mul__(self, other: int | float | complex):
-        if type(other) not in (int, float, complex):
-            raise TypeError
+    def __new__(cls, x, y):
+        if type(x) is int and type(y) is int and 0 <= x < POINT_INTERN_LIMIT and 0 <= y < POINT_INTERN_LIMIT:
+            point = _interned.get((x, y))
+            if point is None:
+                point = _interned[(x, y)] = _new_tuple(cls, (x, y))
+            return point
+        return _new_tuple(cls, (x, y))
 
-        return Point2D(self.x * other, self.y * other)
+    def __getnewargs__(self):
+        return tuple(self)
 
-    def __add__(self, other):
-        if type(other) != Point2D:
-            raise TypeError
+    @property
+    def x(self):
+        return self[0]
 
-        return Point2D(self.x + other.x, self.y + other.y)
+    @property
+    def y(self):
+        return self[1]
+
+    def __mul__(self, other: int | float):
+        return _new_tuple(Point2D, (self[0] * other, self[1] * other))
+
+    __rmul__ = __mul__
+
+    def __add__(self, other: 'Point2D'):
+        return _new_tuple(Point2D, (self[0] + other[0], self[1] + other[1]))
 
     def __neg__(self):
-        return self * -1
+        return _new_tuple(Point2D, (-self[0], -self[1]))
 
-    def __sub__(self, other):
-        return self + -other
+    def __sub__(self, other: 'Point2D'):
+        return _new_tuple(Point2D, (self[0] - other[0], self[1] - other[1]))
 
     def __abs__(self):
-        return Point2D(abs(self.x), abs(self.y))
+        return _new_tuple(Point2D, (abs(self[0]), abs(self[1])))
 
     def __eq__(self, other) -> bool:
-        if type(other) != Point2D:
-            return False
+        return type(other) is Point2D and _tuple_eq(self, other)
 
-        return self.x == other.x and self.y == other.y
+    def __ne__(self, other) -> bool:
+        return not (type(other) is Point2D and _tuple_eq(self, other))
 
-    def __le__(self, other) -> bool:
-        if type(other) != Point2D:
-            raise TypeError
+    __hash__ = tuple.__hash__
 
-        return self.x <= other.x and self.y <= other.y
+    def __le__(self, other) -> bool:
+        return self[0] <= other[0] and self[1] <= other[1]
 
     def __lt__(self, other) -> bool:
-        if type(other) != Point2D:
-            raise TypeError
-
         return self <= other and self != other
 
     def __ge__(self, other) -> bool:
-        if type(other) != Point2D:
-            raise TypeError
-
-        return self.x >= other.x and self.y >= other.y
+        return self[0] >= other[0] and self[1] >= other[1]
 
     def __gt__(self, other) -> bool:
-        if type(other) != Point2D:
-            raise TypeError
-
         return self >= other and self != other
 
-    def __iter__(self):
-        yield self.x
-        yield self.y
-
-    def __round__(self: 'Point2D', ndigits: int = 0) -> 'Point2D':
-        return Point2D(round(self.x, ndigits), round(self.y, ndigits))
+    def __round__(self: 'Point2D', ndigits: int | None = None) -> 'Point2D':
+        return _new_tuple(Point2D, (round(self[0], ndigits), round(self[1], ndigits)))
 
     def __str__(self) -> str:
-        return f"({self.x}, {self.y})"
+        return f"({self[0]}, {self[1]})"
 
-    def __hash__(self) -> int:
-        return hash(str(self))
+    def __repr__(self) -> str:
+        return f"Point2D{self}"
 
     def dist(self, other: 'Point2D') -> float:
-        if type(other) != Point2D:
-            raise TypeError
-        return math.sqrt((self.x-other.x)**2+(self.y-other.y)**2)
-
-    def neighbors(self) -> ['Point2D']:
-        return [
-            self + Direction.UP,
-            self + Direction.RIGHT,
-            self + Direction.DOWN,
-            self + Direction.LEFT
-        ]
+        return math.hypot(self[0] - other[0], self[1] - other[1])
+
+    def neighbors(self) -> ('Point2D', ...):
+        """
+        The orthogonal neighbors in up, right, down, left order, cached for interned points
+        """
+        neighbors = _neighbors.get(self)
+        if neighbors is None:
+            x, y = self
+            neighbors = (Point2D(x, y - 1), Point2D(x + 1, y), Point2D(x, y + 1), Point2D(x - 1, y))
+            if _interned.get((x, y)) is self:
+                _neighbors[self] = neighbors
+        return neighbors
+
+
+_interned: {(int, int): Point2D} = {}
+_neighbors: {Point2D: (Point2D, ...)} = {}
+_new_tuple = tuple.__new__
+_tuple_eq = tuple.__eq__
 
 
 class Direction:
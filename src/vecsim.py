@@ -0,0 +1,297 @@
+"""
+Struct-of-arrays simulator that advances many independent boards one turn per call with NumPy,
+following the rules in engine.LevelState. It needs numpy, which the game itself does not.
+
+    python src/vecsim.py --boards 100000 --level 5 --turns 64
+    python src/vecsim.py --check
+
+Multipliers and scores are int64, so runs long enough to push a multiplier past 2**63 overflow,
+unlike the engine's Python ints.
+"""
+import argparse
+import copy
+import random
+import time
+
+import numpy as np
+
+from constants import FLOW_FIELD_REFRESH_CELLS
+from engine import DIRECTIONS, LevelState, Rules
+
+EMPTY = -1
+PLAYER = -2
+STEPS = np.array([tuple(d) for d in DIRECTIONS], dtype=np.int64)
+
+
+class VectorSim:
+    ONGOING = LevelState.ONGOING
+    LOST = LevelState.LOST
+    WON = LevelState.WON
+
+    def __init__(self, boards: int, level: int = 1, score: int = 0, rules: Rules | None = None, seed: int | None = None):
+        self.rules = rules or Rules()
+        if self.rules.activity_limit() is not None:
+            raise ValueError('the activity radius is not simulated, it must cover the whole arena')
+        self.level = level
+        self.rng = np.random.default_rng(seed)
+        enemies = self.rules.enemy_count(level)
+        width, height = self.rules.width, self.rules.height
+
+        self.player = np.tile(np.array([width // 2, height // 2], dtype=np.int64), (boards, 1))
+        self.multiplier = np.full(boards, self.rules.player_multiplier, dtype=np.int64)
+        self.score = np.full(boards, score, dtype=np.int64)
+        self.turns = np.zeros(boards, dtype=np.int64)
+        self.enemy = np.zeros((boards, enemies, 2), dtype=np.int64)
+        self.health = np.full((boards, enemies), self.rules.enemy_health, dtype=np.int64)
+        self.alive = np.ones((boards, enemies), dtype=bool)
+        # the enemy slot standing on each cell, or EMPTY / PLAYER
+        self.occupancy = np.full((boards, height, width), EMPTY, dtype=np.int16)
+
+        rows = np.arange(boards)
+        self.occupancy[rows, self.player[:, 1], self.player[:, 0]] = PLAYER
+        for slot in range(enemies):
+            # the highest random key among the free cells is a uniform pick of one of them
+            keys = self.rng.random((boards, height * width))
+            keys[self.occupancy.reshape(boards, height * width) != EMPTY] = -1
+            cells = keys.argmax(axis=1)
+            self.enemy[:, slot] = np.stack((cells % width, cells // width), axis=1)
+            self.occupancy[rows, cells // width, cells % width] = slot
+
+    @classmethod
+    def from_states(cls, states: [LevelState]) -> 'VectorSim':
+        """
+        Copies engine levels into a simulator, one board each. All states must share level and rules.
+        """
+        sim = cls(0, states[0].level, rules=states[0].rules)
+        boards, enemies = len(states), sim.rules.enemy_count(sim.level)
+        sim.player = np.array([tuple(s.player.location) for s in states], dtype=np.int64).reshape(boards, 2)
+        sim.multiplier = np.array([s.player.multiplier for s in states], dtype=np.int64)
+        sim.score = np.array([s.score for s in states], dtype=np.int64)
+        sim.turns = np.array([s.turns for s in states], dtype=np.int64)
+        sim.enemy = np.zeros((boards, enemies, 2), dtype=np.int64)
+        sim.health = np.zeros((boards, enemies), dtype=np.int64)
+        sim.alive = np.zeros((boards, enemies), dtype=bool)
+        sim.occupancy = np.full((boards, sim.rules.height, sim.rules.width), EMPTY, dtype=np.int16)
+        for b, state in enumerate(states):
+            sim.occupancy[b, state.player.location.y, state.player.location.x] = PLAYER
+            for slot, enemy in enumerate(state.enemies):
+                sim.enemy[b, slot] = tuple(enemy.location)
+                sim.health[b, slot] = enemy.health
+                sim.alive[b, slot] = True
+                sim.occupancy[b, enemy.location.y, enemy.location.x] = slot
+        return sim
+
+    def status(self) -> np.ndarray:
+        status = np.full(len(self.score), self.ONGOING, dtype=np.int8)
+        status[~self.alive.any(axis=1)] = self.WON
+        status[self.multiplier < 1] = self.LOST
+        return status
+
+    def legal_moves(self) -> np.ndarray:
+        """
+        (boards, 4) mask of the directions in engine.DIRECTIONS order that stay inside the arena
+        """
+        target = self.player[:, None, :] + STEPS[None, :, :]
+        return (target[..., 0] >= 0) & (target[..., 0] < self.rules.width) \
+            & (target[..., 1] >= 0) & (target[..., 1] < self.rules.height)
+
+    def step(self, moves: np.ndarray, draw=None) -> np.ndarray:
+        """
+        Plays one turn on every unfinished board. moves holds an index into engine.DIRECTIONS per board;
+        boards whose move leaves the arena keep their turn, like LevelState.player_move. draw(boards)
+        returns one hit roll in [0, 1) per board index given and defaults to the simulator's generator.
+        Returns the mask of boards that took a turn.
+        """
+        moves = np.asarray(moves)
+        target = self.player + STEPS[moves]
+        acting = (self.status() == self.ONGOING) & self.legal_moves()[np.arange(len(moves)), moves]
+
+        boards = np.nonzero(acting)[0]
+        tx, ty = target[boards, 0], target[boards, 1]
+        standing = self.occupancy[boards, ty, tx]
+        attack = standing >= 0
+        attackers = boards[attack]
+        self.health[attackers, standing[attack]] -= self.multiplier[attackers]
+
+        walkers = boards[~attack]
+        self.occupancy[walkers, self.player[walkers, 1], self.player[walkers, 0]] = EMPTY
+        self.occupancy[walkers, ty[~attack], tx[~attack]] = PLAYER
+        self.player[walkers] = target[walkers]
+
+        self._enemy_phase(acting, draw or (lambda b: self.rng.random(len(b))))
+        return acting
+
+    def _enemy_phase(self, acting: np.ndarray, draw):
+        phase = acting.copy()
+        # like the engine's FlowField, small arenas take the distances again for every enemy and larger ones
+        # take them once per board for the whole phase
+        refresh = self.rules.width * self.rules.height <= FLOW_FIELD_REFRESH_CELLS
+        if not refresh:
+            boards = np.nonzero(acting)[0]
+            distance = self._distance(boards)
+            column = np.zeros(len(acting), dtype=np.int64)
+            column[boards] = np.arange(len(boards))
+        for slot in range(self.alive.shape[1]):
+            active = phase & self.alive[:, slot]
+
+            slain = np.nonzero(active & (self.health[:, slot] < 1))[0]
+            self.score[slain] += self.multiplier[slain]
+            self.multiplier[slain] *= self.rules.enemy_multiplier
+            self.alive[slain, slot] = False
+            self.occupancy[slain, self.enemy[slain, slot, 1], self.enemy[slain, slot, 0]] = EMPTY
+            # collecting a slain enemy ends the phase for every enemy after it
+            phase[slain] = False
+            active[slain] = False
+
+            movers = np.nonzero(active)[0]
+            if len(movers):
+                self._chase(movers, slot, self._distance(movers) if refresh else distance[..., column[movers]], draw)
+
+        self.turns[acting] += 1
+
+    def _distance(self, boards: np.ndarray) -> np.ndarray:
+        """
+        Breadth-first step counts to the player, indexed [y, x, board] for the given boards. Enemies block,
+        unreachable cells hold width * height.
+        """
+        width, height = self.rules.width, self.rules.height
+        unreachable = width * height
+        dtype = np.int16 if unreachable < np.iinfo(np.int16).max else np.int32
+        # boards are the innermost axis so every shifted neighbor view is a run of contiguous memory, and the
+        # border of unreachable cells lets the views be taken without allocating
+        padded = np.full((height + 2, width + 2, len(boards)), unreachable, dtype=dtype)
+        distance = padded[1:-1, 1:-1]
+        distance[self.player[boards, 1], self.player[boards, 0], np.arange(len(boards))] = 0
+        blocked = np.where(self.occupancy[boards] >= 0, unreachable, 0).astype(dtype).transpose(1, 2, 0).copy()
+        relaxed = np.empty_like(blocked)
+        while True:
+            np.minimum(padded[:-2, 1:-1], padded[2:, 1:-1], out=relaxed)
+            np.minimum(relaxed, padded[1:-1, :-2], out=relaxed)
+            np.minimum(relaxed, padded[1:-1, 2:], out=relaxed)
+            relaxed += 1
+            np.minimum(relaxed, distance, out=relaxed)
+            np.maximum(relaxed, blocked, out=relaxed)
+            if np.array_equal(relaxed, distance):
+                return distance
+            distance[...] = relaxed
+
+    def _chase(self, boards: np.ndarray, slot: int, distance: np.ndarray, draw):
+        """
+        Moves the enemy in slot on each board, distance being the field of those boards. Like
+        FlowField.next_step, cells an enemy has stepped onto since the field was taken are passed over.
+        """
+        width, height = self.rules.width, self.rules.height
+        unreachable = width * height
+
+        position = self.enemy[boards, slot]
+        neighbors = position[:, None, :] + STEPS[None, :, :]
+        inside = (neighbors[..., 0] >= 0) & (neighbors[..., 0] < width) \
+            & (neighbors[..., 1] >= 0) & (neighbors[..., 1] < height)
+        nx = np.clip(neighbors[..., 0], 0, width - 1)
+        ny = np.clip(neighbors[..., 1], 0, height - 1)
+        free = self.occupancy[boards[:, None], ny, nx] < 0
+        # widened, the key below overflows the field's int16 on anything but small arenas
+        steps = np.where(inside & free, distance[ny, nx, np.arange(len(boards))[:, None]], unreachable).astype(np.int64)
+
+        # same ordering as FlowField.next_step: steps, then straight line distance, then direction order
+        offset = neighbors - self.player[boards][:, None, :]
+        key = steps * (width * width + height * height + 1) + (offset ** 2).sum(axis=2)
+        choice = key.argmin(axis=1)
+        picked = np.arange(len(boards))
+        reachable = steps[picked, choice] < unreachable
+        boards, choice, picked = boards[reachable], choice[reachable], picked[reachable]
+        destination = neighbors[picked, choice]
+
+        onto_player = (destination == self.player[boards]).all(axis=1)
+        hitters = boards[onto_player]
+        if len(hitters):
+            hit = hitters[draw(hitters) < self.rules.hit_chance]
+            self.multiplier[hit] -= self.rules.enemy_damage
+
+        walkers = boards[~onto_player]
+        destination = destination[~onto_player]
+        self.occupancy[walkers, self.enemy[walkers, slot, 1], self.enemy[walkers, slot, 0]] = EMPTY
+        self.occupancy[walkers, destination[:, 1], destination[:, 0]] = slot
+        self.enemy[walkers, slot] = destination
+
+
+def random_moves(sim: VectorSim, rng: np.random.Generator) -> np.ndarray:
+    """
+    A uniformly random legal direction per board
+    """
+    keys = rng.random((len(sim.score), len(DIRECTIONS)))
+    keys[~sim.legal_moves()] = -1
+    return keys.argmax(axis=1)
+
+
+def check_against_engine(seeds: [int], level: int, turns: int, rules: Rules | None = None) -> [str]:
+    """
+    Plays the same random moves on engine levels and on a simulator built from them, drawing hit rolls from
+    copies of each level's generator. Returns a description of every board that disagreed.
+    """
+    states = [LevelState(level, 0, rules, random.Random(seed)) for seed in seeds]
+    sim = VectorSim.from_states(states)
+    rolls = [copy.deepcopy(state.rng) for state in states]
+    policy = random.Random(0)
+
+    def draw(boards):
+        return np.array([rolls[b].random() for b in boards])
+
+    mismatches = []
+    for turn in range(turns):
+        moves = np.zeros(len(states), dtype=np.int64)
+        for b, state in enumerate(states):
+            if state.status() == LevelState.ONGOING:
+                direction = policy.choice(state.legal_moves())
+                moves[b] = DIRECTIONS.index(direction)
+                state.player_move(direction)
+                state.enemy_phase()
+        sim.step(moves, draw)
+
+        status = sim.status()
+        for b, state in enumerate(states):
+            expected = (
+                tuple(state.player.location), state.player.multiplier, state.score, state.turns, state.status(),
+                sorted((tuple(e.location), e.health) for e in state.enemies)
+            )
+            alive = np.nonzero(sim.alive[b])[0]
+            actual = (
+                tuple(int(v) for v in sim.player[b]), int(sim.multiplier[b]), int(sim.score[b]), int(sim.turns[b]),
+                int(status[b]), sorted((tuple(int(v) for v in sim.enemy[b, s]), int(sim.health[b, s])) for s in alive)
+            )
+            if expected != actual:
+                mismatches.append(f'seed {seeds[b]} turn {turn}: engine {expected} simulator {actual}')
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--boards', type=int, default=10000)
+    parser.add_argument('--level', type=int, default=5)
+    parser.add_argument('--turns', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true', help='compare against engine.LevelState instead')
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = []
+        for level in (1, 3, 7, 15, 31):
+            mismatches += check_against_engine(range(args.seed, args.seed + 200), level, args.turns)
+        print('\n'.join(mismatches[:20]) or 'simulator agrees with the engine')
+        raise SystemExit(1 if mismatches else 0)
+
+    sim = VectorSim(args.boards, args.level, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.turns):
+        sim.step(random_moves(sim, rng))
+    elapsed = time.perf_counter() - start
+    status = sim.status()
+    print(f'{args.boards} boards x {args.turns} turns in {elapsed:.2f}s '
+          f'({args.boards * args.turns / elapsed:,.0f} board turns/s)')
+    print(f'won {(status == VectorSim.WON).mean():.1%} lost {(status == VectorSim.LOST).mean():.1%} '
+          f'mean score {sim.score.mean():.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+from math import ceil, floor
+
+import pygame
+
+from constants import INTEGER_SCALING
+
+
+class Viewport:
+    """
+    Fits the fixed size scene surface into the window. The layout is only recomputed when the window
+    changes (layout() is called on resize and fullscreen toggles), and every frame is scaled straight
+    into a subsurface of the display, so presenting never allocates a new window sized surface.
+    """
+    def __init__(self, scene_size: (int, int)):
+        self.scene_size = scene_size
+        self.scale_factor = 1
+        self.scene_pos = (0, 0)
+        self.target = pygame.Rect((0, 0), scene_size)
+        self._dest: pygame.Surface | None = None
+        # set by layout(), whose black letterbox is only pushed to the display with the next frame
+        self._relayout = True
+        self.layout()
+
+    def layout(self):
+        screen = pygame.display.get_surface()
+        window_size = screen.get_size()
+        scale_factor = min(
+                    window_size[0]/self.scene_size[0],
+                    window_size[1]/self.scene_size[1]
+                )
+        scale_factor = max(floor(scale_factor), 1) if INTEGER_SCALING else scale_factor
+        self.scale_factor = scale_factor
+        self.target = pygame.Rect(
+            0,
+            0,
+            round(self.scene_size[0] * scale_factor),
+            round(self.scene_size[1] * scale_factor)
+        )
+        self.target.center = (window_size[0] // 2, window_size[1] // 2)
+        self.scene_pos = self.target.topleft
+
+        screen.fill('black')
+        self._relayout = True
+        # a window smaller than the scene cannot hold the destination, those frames fall back to a plain blit
+        self._dest = screen.subsurface(self.target) if screen.get_rect().contains(self.target) else None
+
+    def to_scene(self, pos: (float, float)) -> (float, float):
+        return (
+            (pos[0] - self.scene_pos[0]) / self.scale_factor,
+            (pos[1] - self.scene_pos[1]) / self.scale_factor
+        )
+
+    def scale(self, scene_surf: pygame.Surface, dirty: [pygame.Rect]) -> [pygame.Rect]:
+        """
+        Scales the changed regions of the scene into the window, returns the window rects that changed.
+        The first frame after layout() returns the whole window, letterbox included.
+        """
+        if self._dest is None:
+            screen = pygame.display.get_surface()
+            screen.blit(pygame.transform.scale(scene_surf, self.target.size), self.target)
+            self._relayout = False
+            return [screen.get_rect()]
+
+        if self._relayout:
+            self._relayout = False
+            pygame.transform.scale(scene_surf, self.target.size, self._dest)
+            return [pygame.display.get_surface().get_rect()]
+
+        if dirty == [scene_surf.get_rect()]:
+            pygame.transform.scale(scene_surf, self.target.size, self._dest)
+            return [self.target]
+
+        updated = []
+        for rect in dirty:
+            left = floor(rect.left * self.scale_factor)
+            top = floor(rect.top * self.scale_factor)
+            # round outwards so neighbouring regions meet without seams at fractional scales
+            region = pygame.Rect(
+                left,
+                top,
+                min(ceil(rect.right * self.scale_factor), self.target.w) - left,
+                min(ceil(rect.bottom * self.scale_factor), self.target.h) - top
+            )
+            pygame.transform.scale(scene_surf.subsurface(rect), region.size, self._dest.subsurface(region))
+            updated.append(region.move(self.scene_pos))
+        return updated
@@ -0,0 +1,35 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from engine import LevelState, Rules  # noqa: E402
+from replay import LevelRecord, Replay, play_headless  # noqa: E402
+
+
+class CrowdedRules(Rules):
+    """
+    More enemies than fit in a byte
+    """
+    def enemy_count(self, level: int) -> int:
+        return 300
+
+
+def test_waits_of_hundreds_of_enemies_round_trip():
+    rules = CrowdedRules(width=32, height=32, activity_radius=None)
+    state = LevelState(1, 0, rules, random.Random(7))
+    moves = random.Random(0)
+    for turn in range(20):
+        state.player_move(moves.choice(state.legal_moves()))
+        # every other turn all enemies are still sliding, then only those past the first 256
+        waiting = state.enemies if turn % 2 else state.enemies[256:]
+        state.enemy_phase(set(waiting))
+    record = LevelRecord.of(state, 7)
+    assert max(len(waited) for waited in record.waits.values()) > 256
+    assert max(max(waited) for waited in record.waits.values()) > 255
+
+    loaded = Replay.from_bytes(Replay([record]).to_bytes()).levels[0]
+    assert loaded.moves == record.moves
+    assert loaded.waits == record.waits
+    assert play_headless(Replay([loaded]), rules) == [(1, state.status(), state.score)]
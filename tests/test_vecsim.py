@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from engine import Rules  # noqa: E402
+from vecsim import check_against_engine  # noqa: E402
+
+
+class CrowdedRules(Rules):
+    """
+    Enough enemies that they keep stepping into each other's way
+    """
+    def enemy_count(self, level: int) -> int:
+        return 20
+
+
+@pytest.mark.parametrize('level', [1, 3, 7, 15, 31])
+def test_simulator_agrees_with_engine(level):
+    assert check_against_engine(range(50), level, 64) == []
+
+
+def test_simulator_agrees_with_engine_on_a_crowded_board():
+    assert check_against_engine(range(50), 1, 64, CrowdedRules()) == []
+
+
+def test_simulator_agrees_with_engine_on_a_large_arena():
+    # large enough that the enemies' way is searched once per turn
+    rules = CrowdedRules(width=24, height=24, activity_radius=None)
+    assert check_against_engine(range(20), 1, 64, rules) == []